@@ -0,0 +1,91 @@
+"""
+AI policies that can be given a seat in a simulated game.
+A policy decides what a player does on their turn by driving the Board.
+"""
+from evaluator import SettlementEvaluator
+from mcts import MCTSPolicy
+from openings import load_book
+from parallel_mcts import RootParallelMCTSPolicy, LeafParallelMCTSPolicy
+
+
+class RandomPolicy:
+    """Picks uniformly random legal spots (the Board's built in AI)"""
+    name = "random"
+
+    def start_turn(self, board, player):
+        """Place a settlement and road during the start phase"""
+        board.ai_start_turn(player)
+
+    def turn(self, board, player):
+        """Roll, build and end the turn during the main phase"""
+        board.ai_turn(player)
+
+
+class PipsPolicy:
+    """Builds settlements and cities on the spots with the best pip count
+    (see evaluator.SettlementEvaluator), and roads at random"""
+    name = "pips"
+
+    def __init__(self):
+        self.evaluator = None
+
+    def evaluator_for(self, board):
+        """returns the SettlementEvaluator of the board, made the first time it is played on"""
+        if self.evaluator is None or self.evaluator.board is not board:
+            self.evaluator = SettlementEvaluator(board)
+        return self.evaluator
+
+    def start_turn(self, board, player):
+        """Place a settlement and road during the start phase"""
+        board.ai_start_turn(player, self.evaluator_for(board))
+
+    def turn(self, board, player):
+        """Roll, build and end the turn during the main phase"""
+        board.ai_turn(player, self.evaluator_for(board))
+
+
+class BookPolicy(PipsPolicy):
+    """Places the opening book's settlements and roads (see openings.OpeningBook)
+    while the book knows the position, otherwise plays like PipsPolicy"""
+    name = "book"
+
+    def __init__(self, book=None):
+        super().__init__()
+        self.book = book if book is not None else load_book()
+
+    def start_turn(self, board, player):
+        """Place a settlement and road during the start phase"""
+        if not self.book.play(board, player):
+            super().start_turn(board, player)
+
+
+# maps policy names (as used on the command line) to policy classes
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    PipsPolicy.name: PipsPolicy,
+    BookPolicy.name: BookPolicy,
+    MCTSPolicy.name: MCTSPolicy,
+    RootParallelMCTSPolicy.name: RootParallelMCTSPolicy,
+    LeafParallelMCTSPolicy.name: LeafParallelMCTSPolicy,
+}
+
+
+def make_policy(name):
+    """returns a new instance of the policy registered under the given name.
+    The tree search policies take a time budget after a colon, e.g. 'mcts:0.2' searches
+    for 0.2s a move"""
+    name, _, option = name.partition(":")
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy '{name}', expected one of {sorted(POLICIES)}")
+    policy = POLICIES[name]
+    if not option:
+        return policy()
+    # only the tree search policies (MCTSPolicy and its parallel versions) have a time budget
+    if not issubclass(policy, MCTSPolicy):
+        raise ValueError(f"policy '{name}' takes no time budget")
+    try:
+        time_budget = float(option)
+    except ValueError:
+        raise ValueError(f"time budget of '{name}' must be a number of seconds, "
+                         f"got '{option}'") from None
+    return policy(time_budget)
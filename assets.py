@@ -0,0 +1,156 @@
+"""
+Image loading for the renderer.
+Decoding the PNGs is the slowest part of starting the game, so the decoded (and shrunk) pixels
+of each image are cached on disk, keyed by a hash of the asset file and the size it is shrunk to.
+Every image is then packed into a few large atlas textures, so drawing the scene
+switches textures a handful of times instead of once per image.
+The pixels are cached per image rather than as the packed atlas: the images needed for the
+board are shown first and the rest arrive from a background thread (see AssetLoader.start),
+and packing the pre-shrunk pixels into the atlas takes tens of milliseconds, where decoding
+the PNGs takes tens of seconds, so caching the packed atlas would save little.
+Cached images no longer used (from another window width, older assets or an older
+CACHE_VERSION) are deleted when an AssetLoader is made, see prune_cache.
+Images can be loaded straight away, or decoded on a background thread and uploaded later
+(textures can only be created on the main thread).
+"""
+import hashlib
+import os
+import pickle
+import queue
+from threading import Thread
+
+import pyglet
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache")
+# bump when the cache file layout changes
+CACHE_VERSION = 2
+
+
+def cache_key(path, max_width) -> str:
+    """returns a hash of the contents of an asset and the width it is shrunk to"""
+    digest = hashlib.sha1(f"{CACHE_VERSION} {max_width} {path}".encode())
+    with open(path, "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def shrink(image, max_width):
+    """returns (width, height, RGBA bytes) of the image,
+    keeping every nth pixel so it is no less than max_width wide"""
+    step = max(1, image.width // max_width)
+    data = image.get_image_data().get_bytes("RGBA", image.width * 4)
+    if step == 1:
+        return image.width, image.height, data
+    # view the pixels as one 32 bit int each, so a slice can skip whole pixels
+    pixels = memoryview(data).cast("I")
+    rows = [pixels[row * image.width:(row + 1) * image.width:step].tobytes()
+            for row in range(0, image.height, step)]
+    return len(pixels[0:image.width:step]), len(rows), b"".join(rows)
+
+
+def prune_cache(keys):
+    """Delete the cached images whose cache_key isn't one of keys"""
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        key, extension = os.path.splitext(name)
+        if extension == ".pickle" and key not in keys:
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def load_pixels(path, max_width, key=None):
+    """returns (width, height, RGBA bytes) of an image,
+    read from the cache if the asset hasn't changed, otherwise decoded and cached.
+    key is the cache_key of the image, if already known"""
+    if key is None:
+        key = cache_key(path, max_width)
+    cache_path = os.path.join(CACHE_DIR, key + ".pickle")
+    try:
+        with open(cache_path, "rb") as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    pixels = shrink(pyglet.image.load(path), max_width)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # write to a temporary file first so a half written cache is never read
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump(pixels, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # the game still runs without a cache, it just starts slower next time
+        pass
+    return pixels
+
+
+class AssetLoader:
+    """
+    paths: image file of every asset, a path may be listed more than once
+    max_width: images are shrunk to no less than this width
+    images: texture region of every asset, in the same order as paths. None until loaded
+    keys: cache_key of every path
+    """
+    def __init__(self, paths, max_width):
+        self.paths = paths
+        self.max_width = max_width
+        self.keys = {path: cache_key(path, max_width) for path in dict.fromkeys(paths)}
+        prune_cache(set(self.keys.values()))
+        self.images = [None for _ in paths]
+        self.texture_bin = pyglet.image.atlas.TextureBin()
+        # (path, pixels) decoded by the background thread, waiting to be uploaded by poll
+        self.arrived = queue.Queue()
+        self.thread = None
+
+    def unique_paths(self, indices) -> list[str]:
+        """returns the paths of the given assets that aren't loaded yet, each only once"""
+        return list(dict.fromkeys(self.paths[index] for index in indices
+                                  if self.images[index] is None))
+
+    def load(self, indices):
+        """Load the given assets straight away"""
+        for path in self.unique_paths(indices):
+            self.upload(path, load_pixels(path, self.max_width, self.keys[path]))
+
+    def start(self, indices):
+        """Start decoding the given assets on a background thread, see poll"""
+        paths = self.unique_paths(indices)
+
+        def decode():
+            for path in paths:
+                self.arrived.put((path, load_pixels(path, self.max_width, self.keys[path])))
+
+        self.thread = Thread(target=decode, daemon=True)
+        self.thread.start()
+
+    def poll(self) -> bool:
+        """Upload the images the background thread has decoded so far.
+        returns True if any were uploaded"""
+        uploaded = False
+        while True:
+            try:
+                path, pixels = self.arrived.get_nowait()
+            except queue.Empty:
+                return uploaded
+            self.upload(path, pixels)
+            uploaded = True
+
+    def is_loaded(self, indices) -> bool:
+        """True if every one of the given assets has been uploaded"""
+        return all(self.images[index] is not None for index in indices)
+
+    def upload(self, path, pixels):
+        """Add an image to the texture atlas, for every asset using that path"""
+        width, height, data = pixels
+        image = pyglet.image.ImageData(width, height, "RGBA", data)
+        # a one pixel border stops neighbouring images bleeding in when a sprite is scaled
+        region = self.texture_bin.add(image, border=1)
+        for index, other in enumerate(self.paths):
+            if other == path:
+                self.images[index] = region
@@ -0,0 +1,145 @@
+"""
+Micro benchmarks for the game engine.
+
+usage: python benchmark.py [clone] [undo] [games] [search] [search-root] [search-leaf] [evaluator]
+"""
+import argparse
+import copy
+import timeit
+
+from simulate import play_game
+from board import Board
+from evaluator import SettlementEvaluator
+from mcts import MCTSPolicy, legal_moves, roll
+from parallel_mcts import RootParallelMCTSPolicy, LeafParallelMCTSPolicy
+
+
+def midgame_board(seed=0, turns=120):
+    """returns a Board part way through a game, with a realistic number of pieces on it"""
+    board = Board(seed=seed)
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+    for _ in range(turns):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player())
+    return board
+
+
+def time_per_call(function, number):
+    """returns the average time in microseconds of calling function"""
+    return timeit.timeit(function, number=number) / number * 1e6
+
+
+def bench_clone(number=20000):
+    """Compare the ways of copying a board for lookahead search"""
+    earlier = midgame_board(turns=60)
+    board = midgame_board()
+    snapshot = board.snapshot()
+    # the same game 60 turns apart, so restoring has roads, buildings and hands to change
+    apart = (earlier.snapshot(), snapshot)
+    restores = [0]
+
+    def restore_apart():
+        restores[0] += 1
+        board.restore(apart[restores[0] % 2])
+
+    results = {
+        "snapshot()": time_per_call(board.snapshot, number),
+        "restore() to the same state": time_per_call(lambda: board.restore(snapshot), number),
+        "restore() 60 turns apart": time_per_call(restore_apart, number // 10),
+        "clone()": time_per_call(board.clone, number // 10),
+        "copy.deepcopy()": time_per_call(lambda: copy.deepcopy(board), number // 100),
+    }
+    board.restore(snapshot)
+    print(f"board with {len(board.roads)} roads, "
+          f"{sum(player.vps for player in board.players)} victory points on the table")
+    for name, microseconds in results.items():
+        print(f"{name:30} {microseconds:10.2f} us")
+
+
+def bench_undo(number=5000):
+    """Compare unmaking a whole AI turn with the undo log against restoring a snapshot"""
+    board = midgame_board()
+    state = board.game_state
+
+    def make_unmake():
+        mark = board.undo_log.mark()
+        board.ai_turn(state.get_current_player())
+        board.undo_log.undo(mark)
+
+    def make_restore():
+        snapshot = board.snapshot()
+        board.ai_turn(state.get_current_player())
+        board.restore(snapshot)
+
+    board.undo_log.enabled = True
+    undo = time_per_call(make_unmake, number)
+    board.undo_log.enabled = False
+    restore = time_per_call(make_restore, number)
+    print(f"{'ai_turn() + undo()':30} {undo:10.2f} us")
+    print(f"{'ai_turn() + restore()':30} {restore:10.2f} us")
+
+
+def bench_games(number=20):
+    """Time complete games"""
+    microseconds = time_per_call(lambda: play_game(seed=0), number)
+    print(f"{'play_game()':30} {microseconds / 1000:10.2f} ms")
+
+
+def bench_search(policy_class=MCTSPolicy, searches=20):
+    """Time the tree search AI's rollouts from a midgame position"""
+    board = midgame_board()
+    policy = policy_class(time_budget=0.05)
+    roll(board, None)
+    # the first search starts the worker processes of the parallel searches
+    policy.search(board)
+    policy.rollouts = 0
+    policy.search_time = 0.0
+    for _ in range(searches):
+        policy.search(board)
+    print(f"{policy.name + ' rollouts/second':30} {policy.rollouts_per_second():10.1f} "
+          f"({len(legal_moves(board))} moves at the root)")
+
+
+def bench_evaluator(number=20000):
+    """Time scoring settlement spots by pip count from a midgame position"""
+    board = midgame_board()
+    evaluator = SettlementEvaluator(board)
+    spots = board.get_clickable_vertices() or list(range(0, 54, 6))
+    results = {
+        "refresh()": time_per_call(evaluator.refresh, number // 10),
+        "best_spot()": time_per_call(evaluator.best_spot, number),
+        f"best() of {len(spots)} spots": time_per_call(lambda: evaluator.best(spots), number),
+    }
+    for name, microseconds in results.items():
+        print(f"{name:30} {microseconds:10.2f} us")
+
+
+BENCHMARKS = {
+    "clone": bench_clone,
+    "undo": bench_undo,
+    "games": bench_games,
+    "search": bench_search,
+    "search-root": lambda: bench_search(RootParallelMCTSPolicy),
+    "search-leaf": lambda: bench_search(LeafParallelMCTSPolicy),
+    "evaluator": bench_evaluator,
+}
+
+
+def main():
+    """Run the benchmarks named on the command line (all of them by default)"""
+    parser = argparse.ArgumentParser(description="Benchmark the Catan game engine")
+    parser.add_argument("names", nargs="*",
+                        help=f"benchmarks to run, any of {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}'")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
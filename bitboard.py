@@ -0,0 +1,99 @@
+"""
+Compact board occupancy state.
+Every player's settlements, cities and roads are stored as int bitmasks
+(bit i stands for vertex i or edge i), so the placement rules become bitwise operations
+and the whole state can be copied in a few list slices.
+"""
+from board_config import VERTEX_NEIGHBOR_MASKS, VERTEX_EDGE_MASKS, EDGE_VERTEX_MASKS
+
+
+def iter_bits(mask):
+    """Yields the index of every set bit in mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def spread(mask, masks) -> int:
+    """returns the union of masks[i] for every bit i set in mask"""
+    result = 0
+    while mask:
+        low = mask & -mask
+        result |= masks[low.bit_length() - 1]
+        mask ^= low
+    return result
+
+
+class BitBoard:
+    """
+    settlements: per player bitmask of vertices with that player's settlement
+    cities: per player bitmask of vertices with that player's city
+    roads: per player bitmask of edges with that player's road
+    Lists are indexed by player_id.
+    """
+    __slots__ = ("settlements", "cities", "roads")
+
+    def __init__(self, num_players):
+        self.settlements = [0] * num_players
+        self.cities = [0] * num_players
+        self.roads = [0] * num_players
+
+    def copy(self):
+        """returns an independent copy of this state"""
+        clone = BitBoard.__new__(BitBoard)
+        clone.settlements = self.settlements[:]
+        clone.cities = self.cities[:]
+        clone.roads = self.roads[:]
+        return clone
+
+    def place_settlement(self, player_id, vertex_index):
+        """Record a settlement"""
+        self.settlements[player_id] |= 1 << vertex_index
+
+    def place_city(self, player_id, vertex_index):
+        """Record a city replacing the player's settlement"""
+        bit = 1 << vertex_index
+        self.settlements[player_id] &= ~bit
+        self.cities[player_id] |= bit
+
+    def place_road(self, player_id, edge):
+        """Record a road"""
+        self.roads[player_id] |= 1 << edge
+
+    def buildings(self, player_id) -> int:
+        """Vertices holding the player's settlements or cities"""
+        return self.settlements[player_id] | self.cities[player_id]
+
+    def occupied(self) -> int:
+        """Vertices holding anyone's settlement or city"""
+        mask = 0
+        for settlements, cities in zip(self.settlements, self.cities):
+            mask |= settlements | cities
+        return mask
+
+    def taken_edges(self) -> int:
+        """Edges holding anyone's road"""
+        mask = 0
+        for roads in self.roads:
+            mask |= roads
+        return mask
+
+    def road_vertices(self, player_id) -> int:
+        """Vertices at either end of the player's roads"""
+        return spread(self.roads[player_id], EDGE_VERTEX_MASKS)
+
+    def free_vertices(self) -> int:
+        """Vertices where the distance rule allows a settlement:
+        empty and with no settlement or city next to them"""
+        occupied = self.occupied()
+        return ~(occupied | spread(occupied, VERTEX_NEIGHBOR_MASKS)) & ((1 << 54) - 1)
+
+    def is_free(self, vertex_index) -> bool:
+        """Does the distance rule allow a settlement on the vertex"""
+        return not self.occupied() & (VERTEX_NEIGHBOR_MASKS[vertex_index] | (1 << vertex_index))
+
+    def road_edges(self, player_id) -> int:
+        """Empty edges connected to the player's roads, settlements or cities"""
+        reachable = self.buildings(player_id) | self.road_vertices(player_id)
+        return spread(reachable, VERTEX_EDGE_MASKS) & ~self.taken_edges()
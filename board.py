@@ -4,12 +4,22 @@ Handles game logic
 '''
 import random
 from tile import Tile
-from texture_enums import Resource, Card, Color
-from board_config import VERTEX_ADJACENCY, TILE_ADJACENCY, Building, BUILDING_COSTS
+from texture_enums import Resource, Color
+from board_config import VERTEX_TILES, EDGES, EDGE_INDEX, \
+    VERTEX_EDGE_MASKS, EDGE_VERTEX_MASKS, NUM_PLAYERS, \
+    Building, BUILDING_COSTS, BUILDING_COST_COUNTS, VICTORY_POINTS_TO_WIN, \
+    NUM_RESOURCES, BANK_RESOURCE_COUNT, count_resources
 from road import Road
 from game_state import GameState
 from vertex import Vertex
 from player import Player
+from longest_road import LongestRoad
+from bitboard import BitBoard, iter_bits, spread
+from undo import UndoLog
+from zobrist import BUILDING_KEYS, ROAD_KEYS, HAND_KEYS, board_key, turn_key
+
+# the actions whose clickable vertices are cached by Board.get_clickable_vertices
+LEGAL_ACTIONS = ('settlement', 'city', 'road')
 
 
 class Board:
@@ -20,20 +30,47 @@ class Board:
     roads: List of edges with roads built
     resource_bank:
     development_cards
+    rng: random number generator used for dice and AI decisions (seedable for simulations)
     """
-    def __init__(self):
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
         self.players = []
         self.tiles = []
         self.vertices = [Vertex() for _ in range(54)]
         self.roads = []
-        self.resource_bank = {} # maps resource enum values (i.e. Resource.wheat) to a list of cards
+        # owner of the road on each edge (see board_config.EDGES), None if there is no road
+        self.edge_owners = [None] * len(EDGES)
+        # roads touching each vertex
+        self.vertex_roads = [[] for _ in range(54)]
+        # compact copy of every player's settlements, cities and roads as bitmasks
+        self.bitboard = BitBoard(NUM_PLAYERS)
+        # cached longest road of every player
+        self.longest_road = LongestRoad(self)
+        # number of each resource left in the bank, indexed by Resource.value
+        self.resource_bank = [0] * NUM_RESOURCES
         self.development_cards = []
-        self.game_state = GameState(self.players)
+        # roll_payouts[dice sum] holds a (tile_index, vertex_index) pair for every building
+        # that earns from that roll. Cities appear twice, as they earn double.
+        self.roll_payouts = [() for _ in range(13)]
+        # maps (player_id, action) to {phase: tuple of clickable vertex indices}
+        # see get_clickable_vertices
+        self.legal_move_cache = {}
+        # incremented whenever pieces, hands or dice change, so views can tell when to refresh
+        self.revision = 0
+        # records how to reverse each change while search code explores moves in place
+        self.undo_log = UndoLog()
+        self.game_state = GameState(self.players, self.undo_log)
+        # (player_id, vertex1, vertex2) of every road in the order they were placed.
+        # Replaced rather than appended to, so snapshots can share it
+        self.road_history = ()
 
-        self.beginner_setup()
         self.die_roll = (1, 1)
         # add a robber_tile field to track where the robber is currently placed
         self.robber_tile = None
+        self.beginner_setup()
+        # Zobrist hash of the pieces, robber and hands, kept up to date as they change.
+        # see position_key
+        self.zobrist = board_key(self)
 
     def beginner_setup(self):
         """ Add 19 tiles to self.tiles
@@ -79,16 +116,16 @@ class Board:
                                    resource=tile_resources[i]))
 
         # Set up the resource bank
-        for resource in [Resource.brick, Resource.ore,
-                         Resource.sheep, Resource.wheat, Resource.wood]:
-            # Add 19 of each resource type to the board's bank
-            self.resource_bank[resource] = [Card(resource.value) for _ in range(19)]
+        # Add 19 of each resource type to the board's bank
+        self.resource_bank = [BANK_RESOURCE_COUNT] * NUM_RESOURCES
 
         # Set the robber up on the desert tile
         for tile in self.tiles:
             if tile.resource == Resource.desert:
                 self.robber_tile = tile
                 break
+        # (resource, gen_num) of every tile, see set_layout
+        self.layout = tuple((tile.resource, tile.gen_num) for tile in self.tiles)
 
         # Initiate 4 players
         # First player is the user
@@ -115,71 +152,72 @@ class Board:
     def place_road(self, owner, vertex_index1, vertex_index2):
         """ Place road between two vertices. Returns true if successful
          and returns false if unable to place road """
-
-        vertex1 = self.vertices[vertex_index1]
-        vertex2 = self.vertices[vertex_index2]
         # Check if player has less than 15 roads
         if owner.numRoads == 0:
             return False
 
         # Check if the player can afford a road
-        if not owner.has_resources(BUILDING_COSTS[Building.ROAD]):
+        if not owner.can_afford(Building.ROAD):
             return False
 
-        # Bool indicating whether road is allowed
-        allowed = False
-
-        # Check if player has a road or city or settlement there already
-        # Check buildings first
-        if vertex1.owner == owner or vertex2.owner == owner:
-            if vertex1.building == Building.CITY or vertex1.building == Building.SETTLEMENT:
-                allowed = True
-            elif vertex2.building == Building.CITY or vertex2.building == Building.SETTLEMENT:
-                allowed = True
-
-        # Check for adjacent roads
-        for road in self.roads:
-            if road.owner == owner:
-                if road.vertex1 == vertex_index1 or road.vertex2 == vertex_index1:
-                    allowed = True
-                    break
-                elif road.vertex2 == vertex_index1 or road.vertex2 == vertex_index2:
-                    allowed = True
-                    break
-
-        # check if vertices are adjacent to each other:
-        if vertex_index2 not in VERTEX_ADJACENCY[vertex_index1]:
-            allowed = False
-        if vertex_index1 not in VERTEX_ADJACENCY[vertex_index2]:
-            allowed = False
-        if vertex_index2 == vertex_index1:
-            allowed = False
-
-        # Abort or allow to proceed based on allowed value
-        if allowed is False:
+        # The vertices must be adjacent (this also rejects vertex_index1 == vertex_index2)
+        edge = EDGE_INDEX.get((vertex_index1, vertex_index2))
+        if edge is None:
             return False
 
         # Check if road exists between two vertices already
-        for road in self.roads:
-            if road.vertex1 == vertex_index1 and road.vertex2 == vertex_index2:
-                return False
-            elif road.vertex1 == vertex_index2 and road.vertex2 == vertex_index1:
-                return False
-            elif vertex_index1 == vertex_index2:
-                return False
-            else:
-                if vertex_index2 in VERTEX_ADJACENCY[road.vertex1]:
-                    self.roads.append(Road(owner=owner,
-                                           vertex1=vertex_index1,
-                                           vertex2=vertex_index2))
-                    self.remove_resources(owner, BUILDING_COSTS[Building.ROAD])
-                    owner.numRoads -= 1
-                    return True
-        self.roads.append(Road(owner=owner, vertex1=vertex_index1, vertex2=vertex_index2))
+        if self.edge_owners[edge] is not None:
+            return False
+
+        # The road must connect to the player's road, city or settlement
+        if not self.is_road_connected(owner, vertex_index1, vertex_index2):
+            return False
+
+        if self.undo_log.enabled:
+            self.undo_log.push(self.undo_road, owner, edge, self.longest_road.snapshot())
+        road = self.add_road(owner, vertex_index1, vertex_index2)
+        self.bitboard.place_road(owner.player_id, edge)
+        self.longest_road.add_road(road)
+        # the edge is taken for everyone, and the owner can reach new settle spots
+        self.invalidate_legal_moves(actions=('road',))
+        self.invalidate_legal_moves([owner], ('settlement',))
         self.remove_resources(owner, BUILDING_COSTS[Building.ROAD])
         owner.numRoads -= 1
         return True
 
+    def add_road(self, owner, vertex_index1, vertex_index2):
+        """Put a road on the board and in the road indexes, without any checks"""
+        road = Road(owner=owner, vertex1=vertex_index1, vertex2=vertex_index2)
+        self.roads.append(road)
+        self.edge_owners[road.edge] = owner
+        self.vertex_roads[vertex_index1].append(road)
+        self.vertex_roads[vertex_index2].append(road)
+        self.road_history = self.road_history + ((owner.player_id, vertex_index1, vertex_index2),)
+        self.zobrist ^= ROAD_KEYS[owner.player_id][road.edge]
+        return road
+
+    def pop_road(self):
+        """Take the most recently placed road off the board and out of the road indexes"""
+        road = self.roads.pop()
+        self.edge_owners[road.edge] = None
+        self.vertex_roads[road.vertex1].remove(road)
+        self.vertex_roads[road.vertex2].remove(road)
+        self.road_history = self.road_history[:-1]
+        self.zobrist ^= ROAD_KEYS[road.owner.player_id][road.edge]
+        return road
+
+    def is_road_connected(self, owner, vertex_index1, vertex_index2):
+        """Does a road between the two vertices touch the owner's road, city or settlement"""
+        for vertex_index in (vertex_index1, vertex_index2):
+            # Check buildings first
+            if self.vertices[vertex_index].owner is owner:
+                return True
+            # Check for adjacent roads (at most 3 per vertex)
+            for road in self.vertex_roads[vertex_index]:
+                if road.owner is owner:
+                    return True
+        return False
+
     def place_building(self, building, owner, vertex_index):
         """place building at the given vertex_index
            returns False if there's an error or the placement is invalid otherwise, returns True"""
@@ -190,7 +228,7 @@ class Board:
 
         # if the owner can't afford the building, don't let them.
         # special case is during the start phase, when the first 2 settlements are free
-        if not owner.has_resources(BUILDING_COSTS[building]):
+        if not owner.can_afford(building):
             return False
 
 
@@ -201,10 +239,22 @@ class Board:
         vertex = self.vertices[vertex_index]
         if building == Building.SETTLEMENT:
             if self.is_valid_settle_spot(owner, vertex_index):
+                if self.undo_log.enabled:
+                    self.push_building_undo(vertex_index)
                 # case if placing a settlement or city
                 vertex.owner = owner
                 vertex.building = building
+                self.zobrist ^= BUILDING_KEYS[owner.player_id][building][vertex_index]
+                self.bitboard.place_settlement(owner.player_id, vertex_index)
                 owner.numSettlements -= 1
+                owner.vps += 1
+                # the settlement blocks its neighbors for everyone,
+                # and gives the owner a new city spot and road connection
+                self.invalidate_legal_moves(actions=('settlement',))
+                self.invalidate_legal_moves([owner], ('city', 'road'))
+                self.add_roll_payouts(vertex_index)
+                # the settlement may cut another player's road in two
+                self.longest_road.add_building(vertex_index)
                 # remove the cost of the settlement from the player's hand
                 self.remove_resources(owner, BUILDING_COSTS[building])
                 # update tags
@@ -213,11 +263,22 @@ class Board:
                 return True
         elif building == Building.CITY:
             if self.is_valid_city_spot(owner, vertex_index):
+                if self.undo_log.enabled:
+                    self.push_building_undo(vertex_index)
                 vertex.owner = owner
                 vertex.building = building
+                keys = BUILDING_KEYS[owner.player_id]
+                self.zobrist ^= keys[Building.SETTLEMENT][vertex_index] ^ keys[building][vertex_index]
+                self.bitboard.place_city(owner.player_id, vertex_index)
                 owner.numCities -= 1
                 # the owner gets the settlement that they upgraded back
                 owner.numSettlements += 1
+                # a city is worth one more point than the settlement it replaces
+                owner.vps += 1
+                # the settlement is gone and returns to the owner's pool
+                self.invalidate_legal_moves([owner], ('city', 'settlement'))
+                # adding the vertex's payouts a second time makes the city pay double
+                self.add_roll_payouts(vertex_index)
                 # remove the cost of the city from the player's hand
                 self.remove_resources(owner, BUILDING_COSTS[building])
                 return True
@@ -227,18 +288,14 @@ class Board:
 
     def is_valid_settle_spot(self, owner, vertex_index):
         """Is the given vertex_index a valid place for a settlement"""
-        vertex = self.vertices[vertex_index]
         # check if player can afford a settlement
         if not self.game_state.is_start_phase() and \
-        not owner.has_resources(BUILDING_COSTS[Building.SETTLEMENT]):
+        not owner.can_afford(Building.SETTLEMENT):
             return False
-        # check if city or settlement is there already:
-        if vertex.building != Building.NONE:
+        # check if city or settlement is there already, or one vertex away
+        # (see catan rules for more info)
+        if not self.bitboard.is_free(vertex_index):
             return False
-        # check if city or settlement is one vertex away (see catan rules for more info)
-        for neighbor_vertex_index in VERTEX_ADJACENCY[vertex_index]:
-            if self.vertices[neighbor_vertex_index].building != Building.NONE:
-                return False
 
         # If we are in the start phase, we can't place more than one settlement per turn
         if self.game_state.is_start_phase():
@@ -247,9 +304,9 @@ class Board:
             return True
         # If we are in the main phase of the game, 
         # Look for a road that starts/stops on the given vertex
-        for road in self.roads:
+        for road in self.vertex_roads[vertex_index]:
             # if vertex is on the end of a road owned by the given owner, return True
-            if vertex_index in [road.vertex1, road.vertex2] and road.owner is owner:
+            if road.owner is owner:
                 return True
         return False
 
@@ -257,7 +314,7 @@ class Board:
         """Is the given vertex_index a valid place for a city owned by the given player"""
         vertex = self.vertices[vertex_index]
         # Check if player can afford a city
-        if not self.game_state.is_start_phase() and not player.has_resources(BUILDING_COSTS[Building.CITY]):
+        if not self.game_state.is_start_phase() and not player.can_afford(Building.CITY):
             return False
         # Cities can only be placed on existing settlements owned by the player
         if vertex.building == Building.SETTLEMENT and vertex.owner == player:
@@ -266,145 +323,201 @@ class Board:
 
 
     # Is the given edge a valid place for a player to place a road
-    # Is the given vertex_index a valid place for a settlement
     def is_valid_road_spot(self, owner, vertex_index1, vertex_index2):
-        """TODO: Check if the given vertex is a valid spot for a road. Possibly Duplicate."""
-        vertex1 = self.vertices[vertex_index1]
-        vertex2 = self.vertices[vertex_index2]
+        """Check if a road between the given vertices is a valid spot for the owner's road"""
         # Check if player has less than 15 roads
         if owner.numRoads == 0:
             return False
         
         # Check if player has enough to afford a road (in regular phase)
-        if not self.game_state.is_start_phase() and not owner.has_resources(BUILDING_COSTS[Building.ROAD]):
+        if not self.game_state.is_start_phase() and not owner.can_afford(Building.ROAD):
             return False
 
-        # Bool indicating whether road is allowed
-        allowed = False
+        # check if vertices are adjacent to each other (also rejects the same vertex twice)
+        edge = EDGE_INDEX.get((vertex_index1, vertex_index2))
+        if edge is None:
+            return False
 
-        # Check if player has a road or city or settlement there already
-        # Check buildings first
-        if vertex1.owner == owner or vertex2.owner == owner:
-            if vertex1.building == Building.CITY or vertex1.building == Building.SETTLEMENT:
-                allowed = True
-            elif vertex2.building == Building.CITY or vertex2.building == Building.SETTLEMENT:
-                allowed = True
-
-        # Check for adjacent roads
-        for road in self.roads:
-            if road.owner == owner:
-                if road.vertex1 == vertex_index1 or road.vertex2 == vertex_index1:
-                    allowed = True
-                    break
-                elif road.vertex2 == vertex_index1 or road.vertex2 == vertex_index2:
-                    allowed = True
-                    break
-
-        # check if vertices are adjacent to each other:
-        if vertex_index2 not in VERTEX_ADJACENCY[vertex_index1]:
-            allowed = False
-        if vertex_index1 not in VERTEX_ADJACENCY[vertex_index2]:
-            allowed = False
-        if vertex_index2 == vertex_index1:
-            allowed = False
+        # Check if road exists between two vertices already
+        if self.edge_owners[edge] is not None:
+            return False
 
         # In the start phase...
         # Roads must be adjacent to the settlement placed
         if self.game_state.is_start_phase():
             settle_index = self.game_state.tags['settlement_pos']
             if vertex_index2 != settle_index and vertex_index1 != settle_index:
-                allowed = False
-            if vertex_index2 == vertex_index1:
-                allowed = False
-
-        # Abort or allow to proceed based on allowed value
-        if allowed is False:
-            return False
-
-        # Check if road exists between two vertices already
-        for road in self.roads:
-            if road.vertex1 == vertex_index1 and road.vertex2 == vertex_index2:
-                return False
-            elif road.vertex1 == vertex_index2 and road.vertex2 == vertex_index1:
                 return False
-            elif vertex_index1 == vertex_index2:
-                return False
-            else:
-                if vertex_index2 in VERTEX_ADJACENCY[road.vertex1]:
-                    return True
-        return True
+
+        # Check if player has a road or city or settlement there already
+        return self.is_road_connected(owner, vertex_index1, vertex_index2)
 
     # start turn: roll die/distribute resources
-    def start_turn(self, player):
+    def start_turn(self, player, dice=None):
         """
         - Turn for whichever player's turn it is
         - Roll dice and distribute resources
         - Option to trade resources with other players or maritime trade
         - Option to build roads, settlements or cities and/or buy development cards
         - Option to play one development card at any time during turn
+        dice: (die1, die2) to use instead of rolling, for searches that pick the outcome
         """
         # Roll dice first
-        die1 = random.randint(1,6)
-        die2 = random.randint(1,6)
+        if dice is None:
+            die1 = self.rng.randint(1,6)
+            die2 = self.rng.randint(1,6)
+        else:
+            die1, die2 = dice
         roll = die1 + die2
+        self.undo_log.push(setattr, self, 'die_roll', self.die_roll)
         self.die_roll = (die1, die2)
+        self.revision += 1
 
-        # Iterate through tiles
-        for i, tile in enumerate(self.tiles):
-            # First: Check if tile's gen num matches most recent roll
-            if self.tiles[i].gen_num == roll:
-                # new_resource_tiles.append(tile)
-                for vertex_index in TILE_ADJACENCY[i]:
-                    # Next check for players with settlements placed on its nearby vertices
-                    vertex = self.vertices[vertex_index]
-                    if vertex.building != Building.NONE:
-                        # Distribute resources (if not a desert)
-                        if tile.resource is not Resource.desert:
-                            self.add_resources(vertex.owner, [tile.resource])
+        # Distribute resources to every player with a building next to a tile that rolled
+        for player_to_pay, counts in zip(self.players, self.get_roll_payouts(roll)):
+            if any(counts):
+                self.add_resource_counts(player_to_pay, counts)
 
         # If roll == 7
         if roll == 7:
             # Each player with more than 7 resources discards half their hand (round down)
             players_to_discard = []
             for player in self.players:
-                if len(player.resources) >= 7:
+                if player.resource_count() >= 7:
                     players_to_discard.append(player)
 
             # Discard cards at random
             for player in players_to_discard:
-                num_to_discard = len(player.resources) // 2
-                indices_to_discard = []
-                # Choose random indices in player's hand to discard
-                for i in range(num_to_discard):
-                    temp = random.randint(0, len(player.resources) - 1) # rand int is inclusive...
-                    while temp in indices_to_discard:
-                        temp += 1
-                        temp = temp % (len(player.resources) - 1)
-                    indices_to_discard.append(temp)
-                # Find what resources they are
-                resources_to_discard = []
-                for index in indices_to_discard:
-                    resources_to_discard.append(player.resources[index])
+                num_to_discard = player.resource_count() // 2
+                # lay the hand out card by card and choose which ones to discard
+                hand = [Resource(value)
+                        for value, count in enumerate(player.resources)
+                        for _ in range(count)]
+                resources_to_discard = self.rng.sample(hand, num_to_discard)
                 self.remove_resources(player, resources_to_discard)
 
         
         # trading
 
+    def set_layout(self, layout):
+        """Give the tiles the (resource, gen_num) pairs of layout, in tile order.
+        The tiles are replaced rather than changed, so boards sharing them (like clones) keep theirs.
+        The robber stays on the tile with the same index"""
+        robber_index = None if self.robber_tile is None else self.tiles.index(self.robber_tile)
+        self.tiles = [Tile(coords=tile.coords, gen_num=gen_num, resource=resource)
+                      for tile, (resource, gen_num) in zip(self.tiles, layout)]
+        self.layout = layout
+        self.robber_tile = None if robber_index is None else self.tiles[robber_index]
+
+    def shuffle_layout(self, rng):
+        """Deal the resources and generation numbers of the tiles out at random, for a Board
+        no piece has been placed on yet. The robber goes to the desert, which has no number"""
+        resources = [resource for resource, _ in self.layout]
+        gen_nums = [gen_num for resource, gen_num in self.layout if resource is not Resource.desert]
+        rng.shuffle(resources)
+        rng.shuffle(gen_nums)
+        gen_nums = iter(gen_nums)
+        self.set_layout(tuple((resource, 0 if resource is Resource.desert else next(gen_nums))
+                              for resource in resources))
+        self.robber_tile = self.tiles[resources.index(Resource.desert)]
+        self.zobrist = board_key(self)
+
+    def add_roll_payouts(self, vertex_index):
+        """Register the building on the given vertex with every roll that pays out to it.
+        Called once for a settlement and once more when it becomes a city."""
+        for tile_index in VERTEX_TILES[vertex_index]:
+            tile = self.tiles[tile_index]
+            # deserts (and tiles without a number) never pay out
+            if tile.resource is not Resource.desert and 2 <= tile.gen_num <= 12:
+                self.roll_payouts[tile.gen_num] = \
+                    self.roll_payouts[tile.gen_num] + ((tile_index, vertex_index),)
+
+    def get_roll_payouts(self, roll) -> list[list[int]]:
+        """returns the resources each player earns from the given dice roll,
+        as counts indexed by Resource.value in a list ordered by player_id"""
+        payouts = [[0] * NUM_RESOURCES for _ in self.players]
+        for tile_index, vertex_index in self.roll_payouts[roll]:
+            tile = self.tiles[tile_index]
+            # the robber stops its tile from producing
+            if tile is not self.robber_tile:
+                payouts[self.vertices[vertex_index].owner.player_id][tile.resource.value] += 1
+        return payouts
+
     def add_resources(self, player, resources: list[Resource]):
         """adding/removing cards from hand -> maybe move to Player class"""
-        drawn_cards = self.draw_resources(resources)
-        for card in drawn_cards:
-            player.resources.append(card)
-
-
-    def draw_resources(self, resources: list[Resource]) -> list[Card]:
-        """Draw resources from the bank and return a list of returned resources"""
-        hand = []
-        for resource in resources:
-            if len(self.resource_bank[resource]) > 0:
-                hand.append(self.resource_bank[resource].pop())
-        return hand
+        self.add_resource_counts(player, count_resources(resources))
+
+    def add_resource_counts(self, player, counts: list[int]):
+        """Give the player as many of each resource (indexed by Resource.value)
+        as the bank has left"""
+        drawn = self.draw_resources(counts)
+        hand = player.resources
+        keys = HAND_KEYS[player.player_id]
+        total = 0
+        for value, count in enumerate(drawn):
+            if count:
+                self.zobrist ^= keys[value][hand[value]] ^ keys[value][hand[value] + count]
+                hand[value] += count
+                total += count
+        player.resources_drawn += total
+        if total:
+            self.undo_log.push(self.undo_add_resources, player, drawn)
+            # affordability changed
+            self.invalidate_legal_moves([player])
+
+
+    def draw_resources(self, counts: list[int]) -> list[int]:
+        """Draw resources from the bank and return how many of each were drawn
+        (the bank may run out)"""
+        bank = self.resource_bank
+        drawn = [0] * NUM_RESOURCES
+        for value, count in enumerate(counts):
+            if count:
+                drawn[value] = min(count, bank[value])
+                bank[value] -= drawn[value]
+        return drawn
+
+
+    def trade_with_bank(self, player, give: Resource, get: Resource, ratio=4):
+        """Maritime trade: the player gives ratio cards of one resource to the bank
+        in exchange for one card of another. returns truthy value based on success"""
+        if give == get or self.resource_bank[get.value] == 0:
+            return False
+        if not self.remove_resources(player, [give] * ratio):
+            return False
+        self.add_resources(player, [get])
+        return True
 
+    def has_build_spot(self, player, building) -> bool:
+        """Does the player have a piece of the building left and somewhere to put it,
+        whether or not they can afford it"""
+        bitboard = self.bitboard
+        player_id = player.player_id
+        if building == Building.CITY:
+            return player.numCities > 0 and bitboard.settlements[player_id] != 0
+        if building == Building.SETTLEMENT:
+            return player.numSettlements > 0 and \
+                bitboard.free_vertices() & bitboard.road_vertices(player_id) != 0
+        return player.numRoads > 0 and bitboard.road_edges(player_id) != 0
+
+    def ai_trade(self, player, building):
+        """Trade surplus resources with the bank until the player can afford the building
+        or has nothing left worth trading"""
+        cost = BUILDING_COST_COUNTS[building]
+        while not player.can_afford(building):
+            # the first resource the player is short of
+            missing = None
+            # anything left over after paying the cost can be traded away
+            surplus = None
+            for value, count in enumerate(player.resources):
+                if count < cost[value]:
+                    if missing is None:
+                        missing = Resource(value)
+                elif count - cost[value] >= 4 and surplus is None:
+                    surplus = Resource(value)
+            if surplus is None or not self.trade_with_bank(player, surplus, missing):
+                return False
+        return True
 
     def draw_development_card(self, player):
         """Draw a development card from the bank and give it to the given player"""
@@ -416,136 +529,382 @@ class Board:
 
     def remove_resources(self, player, resources: list[Resource]):
         """Remove the given resources from the player's hand. returns truthy value based on success"""
-        removed_resources = []
-        allowed = True
-        for resource in resources:
-            if Card(resource.value) in player.resources:
-                res_index = player.resources.index(Card(resource.value))
-                player.resources.pop(res_index)
-                removed_resources.append(Card(resource.value))
-            else:
-                allowed = False
-        if allowed:
-            for card in removed_resources:
-                self.resource_bank[Resource(card.value)].append(card)
-            return True
-        else:
-            for card in removed_resources:
-                player.resources.append(card)
-            return False
-        
+        return self.remove_resource_counts(player, count_resources(resources))
+
+    def remove_resource_counts(self, player, counts: list[int]):
+        """Return the given number of each resource (indexed by Resource.value)
+        from the player's hand to the bank. Nothing is removed if the player can't cover all of it.
+        returns truthy value based on success"""
+        hand = player.resources
+        for value, count in enumerate(counts):
+            if hand[value] < count:
+                return False
+        bank = self.resource_bank
+        keys = HAND_KEYS[player.player_id]
+        total = 0
+        for value, count in enumerate(counts):
+            if count:
+                self.zobrist ^= keys[value][hand[value]] ^ keys[value][hand[value] - count]
+                hand[value] -= count
+                bank[value] += count
+                total += count
+        if total:
+            self.undo_log.push(self.undo_remove_resources, player, tuple(counts))
+            # affordability changed
+            self.invalidate_legal_moves([player])
+        return True
+
     def get_resources_from_vertex(self, vertex_index):
         """retuns a list of Resources from the surrounding tiles from the vertex"""
         resources = []
-        for tile_index, tile in enumerate(self.tiles):
-            if vertex_index in TILE_ADJACENCY[tile_index]:
-                if tile.resource is not Resource.desert:
-                    resources.append(tile.resource)
+        for tile_index in VERTEX_TILES[vertex_index]:
+            tile = self.tiles[tile_index]
+            if tile.resource is not Resource.desert:
+                resources.append(tile.resource)
         return resources
 
     # check winning conditions
+    def get_winner(self):
+        """returns the first player with enough victory points to win, or None"""
+        for player in self.players:
+            if player.vps >= VICTORY_POINTS_TO_WIN:
+                return player
+        return None
 
     def calculate_player_longest_road(self, player) -> int:
-        """Returns the length of the given player's longest road."""
-        player_roads = [road if road.owner == player else None for road in self.roads]
-        road_graph = {}
-        for road in player_roads:
-            if road is not None:
-                # ensure vertices are in the graph
-                if road.vertex1 not in road_graph.keys():
-                    road_graph[road.vertex1] = []
-                if road.vertex2 not in road_graph.keys():
-                    road_graph[road.vertex2] = []
-                # add two edges to make the graph undirected
-                road_graph[road.vertex1].append(road.vertex2)
-                road_graph[road.vertex2].append(road.vertex1)
-
-        # road_graph is now an adjacency list
-        # connecting vertices that have the given player's roads between them.
-        # We can perform a search (essentially) on this graph to get the longest path, 
-        # and return the length of the longest one.
-        def graph_search(graph,curr,visited) -> int:
-            # only on the first iteration
-            if visited is None: 
-                visited = []
-
-            visited.append(curr)
-
-            path_lengths = [0]
-            # check if a different player's settlement is built on this vertex.
-            if self.vertices[curr].owner not in [player, None]:
-                # if it is, then don't traverse and return the length as 0
-                return 0
-
-            for neighbor in graph[curr]:
-                # check if we've visited the neighbor
-                if neighbor not in visited:
-                    # add one to represent traversing the graph
-                    path_lengths.append(1 + graph_search(graph, neighbor, visited[:]))
-            return max(path_lengths)
-
-        road_lengths = [0]
-        for vertice in road_graph.keys():
-            # for each vertice in the road graph...
-            # graph search returns the length of the segment that the given vertice is on
-            road_lengths.append(graph_search(road_graph, vertice, None))
-
-        # return the maximum road segment length found
-        return max(road_lengths)
-    
+        """Returns the length of the given player's longest road.
+        Kept up to date as roads and settlements are placed, see LongestRoad"""
+        return self.longest_road.length(player)
+
     def get_clickable_vertices(self):
-        """returns a list of the vertex indices that are currently clickable"""
+        """returns a list of the vertex indices that are currently clickable.
+        Results are cached per player and action, see invalidate_legal_moves"""
+
+        state = self.game_state
+        player = state.get_current_player()
+        tags = state.tags
+        # the cache key holds every tag the legality checks read,
+        # so phase transitions land on a different entry instead of needing an invalidation
+        if tags['settlement']:
+            action = 'settlement'
+            phase = (state.is_start, tags['settlements_placed_turn'])
+        elif tags['city']:
+            action = 'city'
+            phase = (state.is_start,)
+        elif tags['road']:
+            action = 'road'
+            phase = (state.is_start, tags['settlement_pos'] if state.is_start else None,
+                     tags['road_v1'])
+        else:
+            return []
+
+        entries = self.legal_move_cache.setdefault((player.player_id, action), {})
+        valid_vertices = entries.get(phase)
+        if valid_vertices is None:
+            valid_vertices = tuple(self.find_clickable_vertices(player, action))
+            entries[phase] = valid_vertices
+        # callers shuffle the result, so hand out a copy
+        return list(valid_vertices)
+
+    def find_clickable_vertices(self, player, action):
+        """returns a list of the vertex indices where the player can currently
+        take the given action ('settlement', 'city' or 'road').
+        Computed with bitmasks from self.bitboard, matching the is_valid_* checks"""
 
         state = self.game_state
-        valid_vertices = []
-        if state.tags['settlement']:
-            # show valid places to place a settlement
-            for vertex_index in range(54):
-                if self.is_valid_settle_spot(state.get_current_player(), vertex_index):
-                    # only add valid settle spots
-                    valid_vertices.append(vertex_index)
-
-        elif state.tags['city']:
-            # show valid places to place a city
-            for vertex_index in range(54):
-                if vertex_index is not None:
-                    if self.is_valid_city_spot(state.get_current_player(), vertex_index):
-                        # only add valid city spots
-                        valid_vertices.append(vertex_index)
-        elif state.tags['road']:
-            if state.tags['road_v1'] is None:
-                # show valid places to start a road
-                for vertex_index in range(54):
-                    for neighbor_vertex in VERTEX_ADJACENCY[vertex_index]:
-                        if self.is_valid_road_spot(state.get_current_player(), vertex_index, neighbor_vertex):
-                            # valid iff there could be a road placed from this vertex to an adjacent vertex
-                            valid_vertices.append(vertex_index)
-                            break
-            else:
-                # show valid places to end a road
-                for vertex_index in range(54):
-                    if self.is_valid_road_spot(state.get_current_player(), state.tags['road_v1'], vertex_index):
-                        # only add valid road ends
-                        valid_vertices.append(vertex_index)
-
-        return valid_vertices
-
-
-    def ai_start_turn(self, player):
-        """The current player takes a turn (during the start phase) automatically"""
+        bitboard = self.bitboard
+        player_id = player.player_id
+        is_start = state.is_start_phase()
+        valid_mask = 0
+        if action == 'settlement':
+            # check if player can afford a settlement
+            if is_start or player.can_afford(Building.SETTLEMENT):
+                # show valid places to place a settlement
+                valid_mask = bitboard.free_vertices()
+                if is_start:
+                    # we can't place more than one settlement per turn
+                    if state.tags['settlements_placed_turn'] >= 1:
+                        valid_mask = 0
+                else:
+                    # settlements must be at the end of one of the player's roads
+                    valid_mask &= bitboard.road_vertices(player_id)
+
+        elif action == 'city':
+            # show valid places to place a city (the player's own settlements)
+            if is_start or player.can_afford(Building.CITY):
+                valid_mask = bitboard.settlements[player_id]
+
+        elif action == 'road':
+            if player.numRoads > 0 and (is_start or player.can_afford(Building.ROAD)):
+                edges = bitboard.road_edges(player_id)
+                if is_start:
+                    # Roads must be adjacent to the settlement placed
+                    settle_index = state.placed_settlement()
+                    edges &= VERTEX_EDGE_MASKS[settle_index] if settle_index is not None else 0
+                road_v1 = state.tags['road_v1']
+                if road_v1 is None:
+                    # show valid places to start a road: either end of a valid edge
+                    valid_mask = spread(edges, EDGE_VERTEX_MASKS)
+                else:
+                    # show valid places to end a road: the far end of valid edges from road_v1
+                    edges &= VERTEX_EDGE_MASKS[road_v1]
+                    valid_mask = spread(edges, EDGE_VERTEX_MASKS) & ~(1 << road_v1)
+
+        return list(iter_bits(valid_mask))
+
+    def invalidate_legal_moves(self, players=None, actions=LEGAL_ACTIONS):
+        """Forget the cached clickable vertices of the given actions for the given players
+        (every player if players is None).
+        Every change to pieces or hands comes through here, so it also bumps self.revision"""
+        self.revision += 1
+        if players is None:
+            players = self.players
+        for player in players:
+            for action in actions:
+                self.legal_move_cache.pop((player.player_id, action), None)
+
+
+    def push_building_undo(self, vertex_index):
+        """Record how to reverse placing a settlement or city on the vertex
+        (the GameState tags it updates record themselves)"""
+        self.undo_log.push(self.undo_building, vertex_index, self.vertices[vertex_index].building,
+                           tuple(self.roll_payouts), self.longest_road.snapshot())
+
+    def undo_building(self, vertex_index, previous_building, roll_payouts, longest_road):
+        """Reverse place_building, see push_building_undo"""
+        vertex = self.vertices[vertex_index]
+        owner = vertex.owner
+        player_id = owner.player_id
+        bit = 1 << vertex_index
+        keys = BUILDING_KEYS[player_id]
+        self.zobrist ^= keys[vertex.building][vertex_index]
+        if previous_building != Building.NONE:
+            self.zobrist ^= keys[previous_building][vertex_index]
+        if previous_building == Building.NONE:
+            # take the settlement back
+            self.bitboard.settlements[player_id] &= ~bit
+            owner.numSettlements += 1
+            vertex.owner = None
+        else:
+            # turn the city back into a settlement
+            self.bitboard.cities[player_id] &= ~bit
+            self.bitboard.settlements[player_id] |= bit
+            owner.numCities += 1
+            owner.numSettlements -= 1
+        vertex.building = previous_building
+        owner.vps -= 1
+        self.roll_payouts[:] = roll_payouts
+        self.longest_road.restore(longest_road)
+        self.invalidate_legal_moves()
+
+    def undo_road(self, owner, edge, longest_road):
+        """Reverse place_road"""
+        self.pop_road()
+        self.bitboard.roads[owner.player_id] &= ~(1 << edge)
+        self.longest_road.restore(longest_road)
+        owner.numRoads += 1
+        self.invalidate_legal_moves()
+
+    def undo_add_resources(self, player, drawn):
+        """Reverse add_resource_counts by returning the drawn cards to the bank"""
+        hand = player.resources
+        bank = self.resource_bank
+        keys = HAND_KEYS[player.player_id]
+        for value, count in enumerate(drawn):
+            self.zobrist ^= keys[value][hand[value]] ^ keys[value][hand[value] - count]
+            hand[value] -= count
+            bank[value] += count
+        player.resources_drawn -= sum(drawn)
+        self.invalidate_legal_moves([player])
+
+    def undo_remove_resources(self, player, counts):
+        """Reverse remove_resource_counts by taking the cards back out of the bank"""
+        hand = player.resources
+        bank = self.resource_bank
+        keys = HAND_KEYS[player.player_id]
+        for value, count in enumerate(counts):
+            self.zobrist ^= keys[value][hand[value]] ^ keys[value][hand[value] + count]
+            hand[value] += count
+            bank[value] -= count
+        self.invalidate_legal_moves([player])
+
+    def position_key(self) -> int:
+        """returns a 64 bit Zobrist hash of the position: the pieces, robber, hands
+        and whose turn it is. Positions reached by different move orders hash the same"""
+        return self.zobrist ^ turn_key(self.game_state)
+
+    def snapshot(self):
+        """returns the mutable state of the game as a flat tuple of immutable values
+        (safe to keep, compare and pickle). The tiles never change during a game,
+        so only their layout is included, see set_layout.
+        This is the copy of the position search code should keep, it takes a few microseconds"""
+        bitboard = self.bitboard
+        return (
+            tuple(bitboard.settlements),
+            tuple(bitboard.cities),
+            tuple(bitboard.roads),
+            self.road_history,
+            tuple([player.snapshot() for player in self.players]),
+            tuple(self.resource_bank),
+            tuple(self.development_cards),
+            self.game_state.snapshot(),
+            self.die_roll,
+            None if self.robber_tile is None else self.tiles.index(self.robber_tile),
+            tuple(self.roll_payouts),
+            self.longest_road.snapshot(),
+            self.zobrist,
+            self.layout,
+        )
+
+    def restore(self, snapshot):
+        """Return the game to the state captured by snapshot().
+        Only the vertices and roads that differ from the snapshot are touched, so the cost
+        grows with the difference: under 10us to an unchanged position, but about 45us
+        between positions 60 turns apart (see benchmark.py clone).
+        To step back a move or two, the undo log is cheaper"""
+        (settlements, cities, roads, road_history, players, bank, development_cards,
+         game_state, die_roll, robber_index, roll_payouts, longest_road, zobrist, layout) = snapshot
+        bitboard = self.bitboard
+        # the layout is shared between the snapshots of a game, so this is usually an identity check
+        if layout is not self.layout and layout != self.layout:
+            self.set_layout(layout)
+
+        # buildings: revisit only the vertices whose bits differ
+        changed = 0
+        for player_id in range(len(self.players)):
+            changed |= (bitboard.settlements[player_id] ^ settlements[player_id]) | \
+                (bitboard.cities[player_id] ^ cities[player_id])
+        for vertex_index in iter_bits(changed):
+            vertex = self.vertices[vertex_index]
+            vertex.owner = None
+            vertex.building = Building.NONE
+            bit = 1 << vertex_index
+            for player_id, player in enumerate(self.players):
+                if settlements[player_id] & bit:
+                    vertex.owner = player
+                    vertex.building = Building.SETTLEMENT
+                elif cities[player_id] & bit:
+                    vertex.owner = player
+                    vertex.building = Building.CITY
+        bitboard.settlements[:] = settlements
+        bitboard.cities[:] = cities
+        bitboard.roads[:] = roads
+
+        # roads: roads are only ever added, so the snapshot's history is usually
+        # a prefix of the current one and the extra roads can be popped off the end
+        if self.road_history[:len(road_history)] != road_history:
+            while self.roads:
+                self.pop_road()
+        while len(self.roads) > len(road_history):
+            self.pop_road()
+        for player_id, vertex_index1, vertex_index2 in road_history[len(self.roads):]:
+            self.add_road(self.players[player_id], vertex_index1, vertex_index2)
+
+        for player, player_snapshot in zip(self.players, players):
+            player.restore(player_snapshot)
+        self.resource_bank[:] = bank
+        self.development_cards[:] = development_cards
+        self.game_state.restore(game_state)
+        self.die_roll = die_roll
+        self.robber_tile = None if robber_index is None else self.tiles[robber_index]
+        self.roll_payouts[:] = roll_payouts
+        self.longest_road.restore(longest_road)
+        # add_road and pop_road above kept it up to date as they went, but the hands and robber
+        # were set directly, so take the snapshot's hash rather than recomputing it
+        self.zobrist = zobrist
+        self.invalidate_legal_moves()
+        # the recorded changes no longer lead back from this state
+        self.undo_log.clear()
+
+    def clone(self):
+        """returns an independent Board in the same state as this one.
+        The indexes are copied as they are rather than rebuilt from a snapshot.
+        The tiles are shared (set_layout replaces them rather than changing them),
+        and the clone gets its own rng.
+        Building the 54 vertices and the road objects takes about 80us, so this is for
+        when a second Board is really needed. Search should keep snapshots and restore them,
+        or make and unmake moves with the undo log"""
+        clone = Board.__new__(Board)
+        clone.rng = random.Random(self.rng.getrandbits(64))
+        players = []
+        for player in self.players:
+            copy = Player(player.player_id, player.color, player.is_user)
+            copy.restore(player.snapshot())
+            players.append(copy)
+        clone.players = players
+        clone.tiles = self.tiles
+        clone.layout = self.layout
+
+        vertices = [Vertex() for _ in range(54)]
+        for vertex_index in iter_bits(self.bitboard.occupied()):
+            vertex = self.vertices[vertex_index]
+            copy = vertices[vertex_index]
+            copy.owner = players[vertex.owner.player_id]
+            copy.building = vertex.building
+        clone.vertices = vertices
+        # roads never change once placed, only their owner has to point at the clone's players
+        copies = {}
+        for road in self.roads:
+            copy = Road.__new__(Road)
+            copy.owner = players[road.owner.player_id]
+            copy.vertex1 = road.vertex1
+            copy.vertex2 = road.vertex2
+            copy.edge = road.edge
+            copies[road] = copy
+        clone.roads = list(copies.values())
+        clone.edge_owners = [None if owner is None else players[owner.player_id]
+                             for owner in self.edge_owners]
+        clone.vertex_roads = [[copies[road] for road in roads] if roads else []
+                              for roads in self.vertex_roads]
+        clone.road_history = self.road_history
+
+        clone.bitboard = self.bitboard.copy()
+        clone.longest_road = LongestRoad(clone)
+        clone.longest_road.restore(self.longest_road.snapshot())
+        clone.resource_bank = self.resource_bank[:]
+        clone.development_cards = self.development_cards[:]
+        clone.roll_payouts = self.roll_payouts[:]
+        # the cached spots are tuples, only the dicts holding them need copying
+        clone.legal_move_cache = {key: dict(entries)
+                                  for key, entries in self.legal_move_cache.items()}
+        clone.revision = 0
+        clone.undo_log = UndoLog()
+        clone.game_state = GameState(players, clone.undo_log)
+        clone.game_state.restore(self.game_state.snapshot())
+        clone.die_roll = self.die_roll
+        clone.robber_tile = self.robber_tile
+        clone.zobrist = self.zobrist
+        return clone
+
+    def ai_pick_spot(self, valid_spots, evaluator=None):
+        """returns the vertex the AI builds on out of valid_spots:
+        the best scoring one if given an evaluator.SettlementEvaluator, otherwise a random one"""
+        if evaluator is not None:
+            return evaluator.best(valid_spots)
+        self.rng.shuffle(valid_spots)
+        return valid_spots[0]
+
+    def ai_start_turn(self, player, evaluator=None):
+        """The current player takes a turn (during the start phase) automatically.
+        Settles the best spot of the evaluator (an evaluator.SettlementEvaluator) if given one"""
         state = self.game_state
         # Look for settle spot
         state.tags['settlement'] = True
         cost = BUILDING_COSTS[Building.SETTLEMENT]
         self.add_resources(state.get_current_player(), cost)
-        valid_spots = self.get_clickable_vertices() 
+        if evaluator is not None:
+            # every free vertex is a valid spot during the start phase
+            spot = evaluator.best_spot()
+            valid_spots = [] if spot is None else [spot]
+        else:
+            valid_spots = self.get_clickable_vertices()
 
         # in this case there should always be valid spots, but this avoids exception
         if valid_spots:
             # Choose random index and build settlement there
-            random.shuffle(valid_spots)
-            self.place_building(Building.SETTLEMENT, player, valid_spots[0])
-            state.tags['settlement_pos'] = valid_spots[0]
+            spot = self.ai_pick_spot(valid_spots)
+            self.place_building(Building.SETTLEMENT, player, spot)
+            state.tags['settlement_pos'] = spot
         state.tags['settlement'] = False
 
         # Look for road spot
@@ -556,14 +915,14 @@ class Board:
 
         # Choose a random index and place first road vertex there
         if valid_spots:
-            random.shuffle(valid_spots)
+            self.rng.shuffle(valid_spots)
             v1 = valid_spots[0]
             state.tags['road_v1'] = v1
 
         # Choose the second vertex
         valid_spots = self.get_clickable_vertices()
         if valid_spots:
-            random.shuffle(valid_spots)
+            self.rng.shuffle(valid_spots)
             v2 = valid_spots[0]
             self.place_road(player, v1, v2)
         state.tags['road_v1'] = None
@@ -577,8 +936,10 @@ class Board:
             resources = self.get_resources_from_vertex(state.tags['settlement_pos'])
             self.add_resources(previous_player, resources)
 
-    def ai_turn(self, player):
-        """The current player takes a turn automatically"""
+    def ai_turn(self, player, evaluator=None):
+        """The current player takes a turn automatically.
+        Picks city and settlement spots with the evaluator (an evaluator.SettlementEvaluator)
+        if given one, otherwise at random"""
         state = self.game_state
         # Call start turn
         state.roll_dice()
@@ -587,30 +948,45 @@ class Board:
         # move the game_state
         state.start_building_phase()
 
+        # Look for legal city spots, trading for one only if it could be placed
+        if self.has_build_spot(player, Building.CITY):
+            self.ai_trade(player, Building.CITY)
+        state.tags['city'] = True
+        valid_spots = self.get_clickable_vertices()
+
+        # Choose a spot and upgrade the settlement there
+        if len(valid_spots) > 0:
+            self.place_building(Building.CITY, player, self.ai_pick_spot(valid_spots, evaluator))
+        state.tags['city'] = False
+
         # Look for legal settle spots
+        if self.has_build_spot(player, Building.SETTLEMENT):
+            self.ai_trade(player, Building.SETTLEMENT)
         state.tags['settlement'] = True
         valid_spots = self.get_clickable_vertices()
 
-        # Choose random index and build settlement there
-        random.shuffle(valid_spots)
+        # Choose a spot and build settlement there
         if len(valid_spots) > 0:
-            self.place_building(Building.SETTLEMENT, player, valid_spots[0])
+            self.place_building(Building.SETTLEMENT, player,
+                                self.ai_pick_spot(valid_spots, evaluator))
         state.tags['settlement'] = False
 
         # Look for legal road spots
+        if self.has_build_spot(player, Building.ROAD):
+            self.ai_trade(player, Building.ROAD)
         state.tags['road'] = True
 
         valid_spots = self.get_clickable_vertices()
 
         # Choose a random index and place first road vertex there
-        random.shuffle(valid_spots)
+        self.rng.shuffle(valid_spots)
         if len(valid_spots) > 0:
             v1 = valid_spots[0]
             state.tags['road_v1'] = v1
 
             # Choose the second vertex
             valid_spots = self.get_clickable_vertices()
-            random.shuffle(valid_spots)
+            self.rng.shuffle(valid_spots)
             v2 = valid_spots[0]
             self.place_road(player, v1, v2)
             state.tags['road_v1'] = None
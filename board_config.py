@@ -97,6 +97,36 @@ TILE_ADJACENCY = [
     [41,46,50,53,49,45]
 ]
 
+# VERTEX_TILES[vertex_index] lists the indices of the tiles touching that vertex
+VERTEX_TILES = [[tile_index for tile_index, vertices in enumerate(TILE_ADJACENCY)
+                 if vertex in vertices]
+                for vertex in range(54)]
+
+# Canonical edge table derived from VERTEX_ADJACENCY
+# EDGES[edge_id] is the (lower, higher) pair of vertex indices the edge connects
+EDGES = [(vertex, neighbor)
+         for vertex, neighbors in enumerate(VERTEX_ADJACENCY)
+         for neighbor in sorted(neighbors) if vertex < neighbor]
+
+# maps a pair of vertex indices (in either order) to the id of the edge between them
+EDGE_INDEX = {pair: edge_id
+              for edge_id, edge in enumerate(EDGES)
+              for pair in (edge, edge[::-1])}
+
+# VERTEX_EDGES[vertex_index] lists the ids of the edges touching that vertex
+VERTEX_EDGES = [[EDGE_INDEX[(vertex, neighbor)] for neighbor in neighbors]
+                for vertex, neighbors in enumerate(VERTEX_ADJACENCY)]
+
+# VERTEX_EDGE_MASKS[vertex_index] has bit edge_id set for every edge touching that vertex
+VERTEX_EDGE_MASKS = [sum(1 << edge_id for edge_id in edge_ids) for edge_ids in VERTEX_EDGES]
+
+# Bitmasks used by the compact BitBoard state (bit i stands for vertex i or edge i)
+# VERTEX_NEIGHBOR_MASKS[vertex_index] has a bit set for every vertex next to that vertex
+VERTEX_NEIGHBOR_MASKS = [sum(1 << neighbor for neighbor in neighbors)
+                         for neighbors in VERTEX_ADJACENCY]
+# EDGE_VERTEX_MASKS[edge_id] has the bits of the two vertices the edge connects set
+EDGE_VERTEX_MASKS = [(1 << vertex1) | (1 << vertex2) for vertex1, vertex2 in EDGES]
+
 class Building(Enum):
     """Enum representing building types"""
     NONE = 0
@@ -112,3 +142,29 @@ BUILDING_COSTS = {
     Building.ROAD : 
         [Resource.wood, Resource.brick] # 1 wood, 1 brick
 }
+
+# Number of players in a game
+NUM_PLAYERS = 4
+
+# Number of victory points a player needs to win the game
+VICTORY_POINTS_TO_WIN = 10
+
+# Number of resource types (every Resource except the desert)
+NUM_RESOURCES = 5
+
+# Number of cards of each resource the bank starts with
+BANK_RESOURCE_COUNT = 19
+
+# chance of rolling each sum with two dice, indexed by the sum (0 and 1 can't be rolled)
+ROLL_PROBABILITIES = [(6 - abs(roll - 7)) / 36 if roll >= 2 else 0.0 for roll in range(13)]
+
+def count_resources(resources) -> list[int]:
+    """returns how many of each resource the given list contains, indexed by Resource.value"""
+    counts = [0] * NUM_RESOURCES
+    for resource in resources:
+        counts[resource.value] += 1
+    return counts
+
+# BUILDING_COSTS as resource counts indexed by Resource.value
+BUILDING_COST_COUNTS = {building: tuple(count_resources(cost))
+                        for building, cost in BUILDING_COSTS.items()}
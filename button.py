@@ -1,5 +1,6 @@
 """represents a button. 
-offers basic functionality for checking if points are within the bounds."""
+offers basic functionality for checking if points are within the bounds,
+and a grid for finding the button under a point without testing every button."""
 import math
 import pyglet
 from texture_enums import Color
@@ -8,7 +9,7 @@ class Button:
     """
     Class to represent a button with either a point-radius (circle) or a bounding box (rectangle)
     """
-    def __init__(self, is_circle: bool=False, center: tuple[int,int]=(0,0), button_sprite=None, radius=0, width=0, height=0, button_name=-1, button_label=None):
+    def __init__(self, is_circle: bool=False, center: tuple[int,int]=(0,0), button_sprite=None, radius=0, width=0, height=0, button_name=-1, button_label=None, batch=None, group=None):
         self.button_name = button_name
         self.is_circle = is_circle
         self.center = center
@@ -18,7 +19,7 @@ class Button:
             self.radius = radius
             if button_sprite is None:
                 self.button_sprite = pyglet.shapes.Circle(self.center[0], self.center[1], 
-                    self.radius, color=Color.red.value)
+                    self.radius, color=Color.red.value, batch=batch, group=group)
             else:
                 self.button_sprite = button_sprite
         else:
@@ -30,7 +31,7 @@ class Button:
 
             if button_sprite is None:
                 self.button_sprite = pyglet.shapes.Rectangle(self.top_left[0], self.bottom_right[1], 
-                    width, height, color=Color.red.value)
+                    width, height, color=Color.red.value, batch=batch, group=group)
             else:
                 self.button_sprite = button_sprite
 
@@ -40,18 +41,62 @@ class Button:
         x = point[0]
         y = point[1]
         if self.is_circle:
-            # pythagorean distance between the two points
-            distance = math.sqrt((self.center[0] - x)**2 + (self.center[1] - y)**2)
             # a point is within the circle if it is less than a radius away from the center
-            return distance < self.radius
+            # (comparing squared distances saves a square root)
+            return (self.center[0] - x)**2 + (self.center[1] - y)**2 < self.radius**2
 
         # return whether the point is within the bounding box
         x_within = self.top_left[0] <= x and self.bottom_right[0] >= x
         y_within = self.top_left[1] >= y and self.bottom_right[1] <= y
         return x_within and y_within
 
-    def draw(self):
-        """Draw the internal rectangle"""
-        self.button_sprite.draw()
+    def move(self, center, radius=0, width=0, height=0):
+        """Change the position and size of the button, along with its sprite and label"""
+        self.center = center
+        if self.is_circle:
+            self.radius = radius
+            self.button_sprite.position = center
+            self.button_sprite.radius = radius
+        else:
+            self.top_left = (center[0] - width/2, center[1] + height/2)
+            self.bottom_right = (center[0] + width/2, center[1] - height/2)
+            self.width = width
+            self.height = height
+            self.button_sprite.position = (self.top_left[0], self.bottom_right[1])
+            self.button_sprite.width = width
+            self.button_sprite.height = height
         if self.button_label:
-            self.button_label.draw()
+            self.button_label.position = (center[0], center[1], self.button_label.z)
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        """returns the (left, bottom, right, top) edges of the button"""
+        if self.is_circle:
+            return (self.center[0] - self.radius, self.center[1] - self.radius,
+                    self.center[0] + self.radius, self.center[1] + self.radius)
+        return (self.top_left[0], self.bottom_right[1], self.bottom_right[0], self.top_left[1])
+
+
+class HitGrid:
+    """
+    Uniform grid of square cells over the window, for finding the buttons under a point
+    by testing only the few buttons that overlap the point's cell.
+    cell_size: width and height of a cell in pixels
+    cells: maps (column, row) to the (item, button) pairs whose bounds overlap that cell
+    """
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def add(self, item, button):
+        """Add a button to every cell its bounds overlap. item is returned by hits"""
+        left, bottom, right, top = button.bounds()
+        for column in range(math.floor(left / self.cell_size),
+                            math.floor(right / self.cell_size) + 1):
+            for row in range(math.floor(bottom / self.cell_size),
+                             math.floor(top / self.cell_size) + 1):
+                self.cells.setdefault((column, row), []).append((item, button))
+
+    def hits(self, point: tuple[int,int]) -> list:
+        """returns the item of every button containing the point"""
+        cell = (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+        return [item for item, button in self.cells.get(cell, ()) if button.contains(point)]
@@ -0,0 +1,129 @@
+"""
+Settlement spot evaluation by pip count.
+A spot is worth the expected number of cards it produces a roll, with each resource weighted
+by how much it is wanted: the 54x19 vertex-tile incidence matrix times the 19-vector of
+(chance of the tile's number being rolled * weight of its resource) scores every vertex at once.
+The scores only change when the robber moves, and the vertices the distance rule allows
+are kept up to date a settlement at a time, so picking a spot costs a few microseconds
+and the AI can use it in rollouts.
+numpy is optional, without it the same scores are computed with lists.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from board_config import TILE_ADJACENCY, VERTEX_ADJACENCY, ROLL_PROBABILITIES
+from bitboard import iter_bits
+from texture_enums import Resource
+
+# RESOURCE_WEIGHTS[Resource.value], cities want ore and wheat,
+# settlements and roads want brick and wood, sheep only go into settlements
+RESOURCE_WEIGHTS = [1.0, 1.0, 0.8, 0.9, 0.9, 0.0]
+
+# INCIDENCE[vertex_index][tile_index] is 1 if the vertex is on the tile
+INCIDENCE = [[1.0 if vertex in vertices else 0.0 for vertices in TILE_ADJACENCY]
+             for vertex in range(54)]
+
+# BLOCKED[vertex_index] lists the vertices a settlement on it rules out: itself and its neighbors
+BLOCKED = [[vertex] + neighbors for vertex, neighbors in enumerate(VERTEX_ADJACENCY)]
+
+
+def tile_values(board, weights=RESOURCE_WEIGHTS) -> list[float]:
+    """returns the expected weighted cards per roll of a settlement on each tile,
+    0 for the desert and the tile the robber is on"""
+    return [0.0 if tile is board.robber_tile or tile.resource is Resource.desert
+            else ROLL_PROBABILITIES[tile.gen_num] * weights[tile.resource.value]
+            if 2 <= tile.gen_num <= 12 else 0.0
+            for tile in board.tiles]
+
+
+class SettlementEvaluator:
+    """
+    Scores the vertices of one Board for a settlement.
+    board: the Board evaluated
+    weights: how much a card of each resource is worth, indexed by Resource.value
+    scores: score of every vertex, whether a settlement may go there or not
+    score_list: the same scores as a list, quicker to index one by one than an array
+    mask: whether the distance rule allows a settlement on each vertex
+    """
+    def __init__(self, board, weights=RESOURCE_WEIGHTS):
+        self.board = board
+        self.weights = weights
+        if np is not None:
+            self.incidence = np.array(INCIDENCE)
+            self.blocked = [np.array(vertices) for vertices in BLOCKED]
+        self.robber_tile = None
+        self.scores = None
+        self.score_list = None
+        self.refresh()
+        # the occupied vertices the mask was made for
+        self.occupied = board.bitboard.occupied()
+        self.mask = self.unpack(board.bitboard.free_vertices())
+
+    def refresh(self):
+        """Score every vertex again, for where the robber is now"""
+        self.robber_tile = self.board.robber_tile
+        values = tile_values(self.board, self.weights)
+        if np is not None:
+            self.scores = self.incidence @ np.array(values)
+            self.score_list = self.scores.tolist()
+        else:
+            self.scores = [sum(incident * value for incident, value in zip(row, values))
+                           for row in INCIDENCE]
+            self.score_list = self.scores
+
+    def unpack(self, free):
+        """returns the vertex mask of a bitboard of vertices"""
+        if np is not None:
+            return np.unpackbits(np.frombuffer(free.to_bytes(7, "little"), dtype=np.uint8),
+                                 count=54, bitorder="little").astype(bool)
+        return [bool(free >> vertex & 1) for vertex in range(54)]
+
+    def block(self, vertex_index):
+        """Rule out the vertex and its neighbors, after a settlement was placed on it"""
+        if np is not None:
+            self.mask[self.blocked[vertex_index]] = False
+        else:
+            for vertex in BLOCKED[vertex_index]:
+                self.mask[vertex] = False
+
+    def legal_mask(self):
+        """returns the mask of vertices the distance rule allows a settlement on.
+        Buildings added since the last call only block their neighbors,
+        the mask is only made again when some were taken back (by the undo log)"""
+        occupied = self.board.bitboard.occupied()
+        if occupied != self.occupied:
+            if occupied & self.occupied == self.occupied:
+                for vertex in iter_bits(occupied & ~self.occupied):
+                    self.block(vertex)
+            else:
+                self.mask = self.unpack(self.board.bitboard.free_vertices())
+            self.occupied = occupied
+        return self.mask
+
+    def masked_scores(self):
+        """returns the score of every vertex, -1 where a settlement isn't allowed"""
+        if self.robber_tile is not self.board.robber_tile:
+            self.refresh()
+        mask = self.legal_mask()
+        if np is not None:
+            return np.where(mask, self.scores, -1.0)
+        return [score if legal else -1.0 for score, legal in zip(self.scores, mask)]
+
+    def best_spot(self):
+        """returns the best vertex the distance rule allows a settlement on, None if there is none"""
+        scores = self.masked_scores()
+        if np is not None:
+            best = int(scores.argmax())
+        else:
+            best = max(range(54), key=scores.__getitem__)
+        return best if scores[best] >= 0 else None
+
+    def best(self, spots) -> int:
+        """returns the best scoring of the given vertices (e.g. clickable settlement or city spots).
+        A city produces twice what its settlement did, so the same scores rank city spots"""
+        if self.robber_tile is not self.board.robber_tile:
+            self.refresh()
+        # candidate lists are short, indexing them one by one beats building an array
+        return max(spots, key=self.score_list.__getitem__)
@@ -0,0 +1,92 @@
+"""
+Multi-process game farm.
+Shards simulated games across a pool of worker processes and streams the
+compact per-game results back to the parent as they finish.
+
+Game i of a run is always seeded with seed + i, no matter which worker plays it,
+so a run is reproduced exactly by repeating it with the same seed,
+whatever the number of workers.
+
+usage: python farm.py --games 100000 --workers 32 --seed 0 --out results.csv
+"""
+import argparse
+import csv
+import os
+import time
+from multiprocessing import Pool
+
+from simulate import play_game, summarize, DEFAULT_POLICIES, MAX_TURNS
+
+# number of games handed to a worker at a time
+# large enough to amortize inter-process overhead, small enough to keep every core busy
+CHUNK_SIZE = 16
+
+# (max_turns, policies) for the games played by this worker, set by _worker_init
+_WORKER_SETTINGS = (MAX_TURNS, DEFAULT_POLICIES)
+
+
+def _worker_init(max_turns, policies):
+    """Runs once in each worker process. Stores the settings shared by every game."""
+    global _WORKER_SETTINGS
+    _WORKER_SETTINGS = (max_turns, policies)
+
+
+def _play(game_seed):
+    """Plays one game inside a worker. The Board is created and discarded in the worker,
+    only the compact GameResult is sent back to the parent."""
+    max_turns, policies = _WORKER_SETTINGS
+    return play_game(game_seed, max_turns, policies)
+
+
+def run_farm(games, seed=0, workers=None, max_turns=MAX_TURNS, policies=DEFAULT_POLICIES):
+    """Generator yielding a GameResult for every game as soon as a worker finishes it.
+    Results arrive in completion order, sort them by seed to get the run order back."""
+    workers = workers or os.cpu_count() or 1
+    seeds = range(seed, seed + games)
+    with Pool(workers, initializer=_worker_init, initargs=(max_turns, tuple(policies))) as pool:
+        yield from pool.imap_unordered(_play, seeds, chunksize=CHUNK_SIZE)
+
+
+def write_results(results, path):
+    """Write results to a csv file with one row per game"""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["seed", "winner", "turns", "vps", "resources_drawn"])
+        for result in results:
+            writer.writerow([
+                result.seed,
+                "" if result.winner is None else result.winner,
+                result.turns,
+                " ".join(str(vps) for vps in result.vps),
+                " ".join(str(drawn) for drawn in result.resources_drawn)])
+
+
+def main():
+    """Parse command line arguments and run the farm"""
+    parser = argparse.ArgumentParser(description="Run AI-vs-AI Catan games on every core")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (defaults to one per core)")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+                        help="stop a game without a winner after this many turns")
+    parser.add_argument("--policies", default=",".join(DEFAULT_POLICIES),
+                        help="comma separated policy name for each seat")
+    parser.add_argument("--out", default=None, help="csv file to write per-game results to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = []
+    for result in run_farm(args.games, args.seed, args.workers, args.max_turns,
+                           args.policies.split(",")):
+        results.append(result)
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda result: result.seed)
+    if args.out:
+        write_results(results, args.out)
+    print(summarize(results, elapsed))
+
+
+if __name__ == "__main__":
+    main()
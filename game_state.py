@@ -8,28 +8,80 @@ class TurnState(Enum):
     BUILDING = "building"
     END_TURN = "end_turn"
 
+class Tags(dict):
+    """The flags used to track what the player is doing in the middle of a turn.
+    Writes are recorded in the undo_log (if there is one) so they can be reversed."""
+    def __init__(self, undo_log, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.undo_log = undo_log
+
+    def __setitem__(self, key, value):
+        undo_log = self.undo_log
+        if undo_log is not None and undo_log.enabled:
+            if key in self:
+                undo_log.push(dict.__setitem__, self, key, self[key])
+            else:
+                undo_log.push(dict.pop, self, key)
+        super().__setitem__(key, value)
+
 class GameState:
-    """Represents what state the game is currently in."""
-    def __init__(self, players):
+    """Represents what state the game is currently in.
+    undo_log (optional UndoLog) records the transitions so they can be reversed"""
+    def __init__(self, players, undo_log=None):
         self.players = players
+        self.undo_log = undo_log
+        # incremented on every transition, so views can tell when to refresh
+        self.revision = 0
         self.current_player_index = 0
         self.state = TurnState.BUILDING
-        self.tags = {'city': False,
-                     'settlement': False,
-                     'road': False,
-                     'road_v1': None,
-                     'settlements_placed_turn': 0,
-                     'settlements_placed': 0,
-                     'settlement_pos': -1}
+        self.tags = Tags(undo_log,
+                         {'city': False,
+                          'settlement': False,
+                          'road': False,
+                          'road_v1': None,
+                          'settlements_placed_turn': 0,
+                          'settlements_placed': 0,
+                          'settlement_pos': -1})
         self.is_start = True
 
+    def snapshot(self):
+        """returns the game state as a tuple, see Board.snapshot"""
+        return (self.current_player_index, self.state, self.is_start, tuple(self.tags.items()))
+
+    def restore(self, snapshot):
+        """Return to the state captured by snapshot()"""
+        self.current_player_index, self.state, self.is_start, tags = snapshot
+        self.tags.update(tags)
+        self.revision += 1
+
+    def save(self):
+        """Record the current state so the transition about to happen can be undone
+        (tags record their own changes)"""
+        self.revision += 1
+        if self.undo_log is not None and self.undo_log.enabled:
+            self.undo_log.push(self.restore_turn, self.current_player_index, self.state, self.is_start)
+
+    def restore_turn(self, current_player_index, state, is_start):
+        """Reverse a transition recorded by save()"""
+        self.current_player_index = current_player_index
+        self.state = state
+        self.is_start = is_start
+        self.revision += 1
+
     def get_current_player(self):
         """Returns the player whose turn it is."""
         return self.players[self.current_player_index]
 
+    def placed_settlement(self):
+        """returns the vertex of the settlement the start phase road has to touch,
+        None if none was placed (the tag starts at -1, and the UI resets it to None)"""
+        vertex_index = self.tags['settlement_pos']
+        return None if vertex_index in (None, -1) else vertex_index
+
     def roll_dice(self):
         """Transition from BEFORE_ROLL to AFTER_ROLL."""
         if self.state == TurnState.BEFORE_ROLL:
+            self.save()
             self.state = TurnState.AFTER_ROLL
             return True
         return False
@@ -37,6 +89,7 @@ class GameState:
     def start_building_phase(self):
         """Transition from AFTER_ROLL to BUILDING."""
         if self.state == TurnState.AFTER_ROLL:
+            self.save()
             self.state = TurnState.BUILDING
             return True
         return False
@@ -53,6 +106,7 @@ class GameState:
         Ends the start phase if every player has played 2 settlements.
         Players take turns clockwise, then counterclockwise.
         returns True if this was the player's second settlement"""
+        self.save()
         # reset tags
         self.tags['settlements_placed_turn'] = 0
         # if the number of settlements placed is 2 per player, end the start phase.
@@ -74,6 +128,7 @@ class GameState:
 
     def next_turn(self):
         """Cycle to the next player's turn."""
+        self.save()
         self.current_player_index = (self.current_player_index + 1) % len(self.players)
         self.state = TurnState.BEFORE_ROLL
 
@@ -89,6 +144,7 @@ class GameState:
 
     def end_start_phase(self):
         """transition from the start phase to the main game loop"""
+        self.save()
         self.is_start = False
 
     def get_ui_state(self):
@@ -0,0 +1,228 @@
+"""
+Screen layout.
+The window is divided into rectangular areas (the board, the player's hand, the bank,
+the player info panel, the dice and each button), and every sprite is positioned and scaled
+from the bounds of its area, so the game can be drawn at any window size.
+The areas, and the position and size of every sprite and label in them, are only worked out
+once per window size: on a resize the renderer looks them up and assigns them to its sprites.
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache, wraps
+
+from board_config import TILE_ADJACENCY
+
+# x, y is the bottom-left corner
+Rect = namedtuple("Rect", ["x", "y", "width", "height"])
+
+# the window size the font sizes and line widths were picked for
+DESIGN_WIDTH = 3000
+DESIGN_HEIGHT = 1500
+
+
+def cached(method):
+    """Cache what a Layout method returns for each set of arguments, on the Layout"""
+    @wraps(method)
+    def wrapper(self, *args):
+        key = (method.__name__, args)
+        if key not in self.placements:
+            self.placements[key] = method(self, *args)
+        return self.placements[key]
+    return wrapper
+
+
+def label_corner(rect) -> tuple[tuple[float, float], Rect]:
+    """returns the center of a count label in the upper right corner of a sprite's area,
+    and the area of the box behind it"""
+    label = (rect.x + rect.width * .75, rect.y + rect.height * .85)
+    background = Rect(rect.x + rect.width * .5, rect.y + rect.height * .7,
+                      rect.width * .5, rect.height * .3)
+    return label, background
+
+
+class Layout:
+    """
+    width, height: size of the window
+    scale: size of the window relative to the design size, for font sizes and line widths
+    board: square area the tiles are centered in
+    tile_width: width of a hexagon tile
+    hand: area in the bottom left for the cards in the current player's hand
+    card_width: width of a card in the hand
+    bank: area on the right for the bank's resource cards
+    player_info: area below the bank for the player info panel
+    player_info_row: height of one player's row in the panel
+    buttons: maps button_name to the area of that button
+    dice: area above the roll button the two dice are drawn in
+    left_die, right_die: area of each die, side by side in the dice area
+    placements: the positions worked out by the methods below, by method and arguments.
+    The methods take the height to width ratio (aspect) of the images placed, as loaded
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.scale = min(width / DESIGN_WIDTH, height / DESIGN_HEIGHT)
+
+        # the board is five tiles across, kept square so it fits narrow windows too
+        self.tile_width = min(width * 0.075, height * 0.15)
+        board_width = self.tile_width * 5
+        self.board = Rect(width / 2 - board_width / 2, height / 2 - board_width / 2,
+                          board_width, board_width)
+
+        self.card_width = min(width * 0.06, height * 0.12)
+        # five cards across and two rows of cards high
+        self.hand = Rect(0, 0, self.card_width * 5, height / 2)
+
+        # bank cards are half the size of the cards in the hand
+        bank_card_width = self.card_width / 2
+        padding = bank_card_width / 30
+        self.bank = Rect(width - padding - bank_card_width * 5, height / 2 + padding,
+                         bank_card_width * 5, height * 0.1)
+
+        # rows run down from the top of the panel
+        self.player_info_row = height * 0.09 + self.card_width / 120
+        self.player_info = Rect(width * 0.85, height * 0.40 - self.player_info_row * 3,
+                                width * 0.15, self.player_info_row * 4)
+
+        pad = height * 0.005
+        button_width = width * 0.15 - pad
+        button_height = height * 0.120 - pad
+        # no wider than the tile spacing, so narrow windows don't overlap them
+        build_size = min(height * 0.1, self.tile_width * 0.8)
+        self.buttons = {
+            "end_turn": Rect(width - button_width - pad, pad, button_width, button_height),
+            "roll_dice": Rect(width - button_width - pad, height * 0.67 - button_height / 2,
+                              button_width, button_height),
+            "run_ai_turn": Rect(width - button_width * 2 - pad * 3, pad,
+                                button_width, button_height),
+            # the build buttons sit under the board, a tile apart
+            "build_settlement": Rect(width / 2 - self.tile_width - build_size / 2,
+                                     height * 0.08 - build_size / 2, build_size, build_size),
+            "build_city": Rect(width / 2 - build_size / 2,
+                               height * 0.08 - build_size / 2, build_size, build_size),
+            "build_road": Rect(width / 2 + self.tile_width - build_size / 2,
+                               height * 0.08 - build_size / 2, build_size, build_size),
+        }
+        roll = self.buttons["roll_dice"]
+        self.dice = Rect(roll.x, roll.y + roll.height, roll.width, roll.height)
+        die_width = min(self.dice.width / 2, self.dice.height) * 0.8
+        x_pad = (self.dice.width - die_width * 2) / 3
+        die_y = self.dice.y + (self.dice.height - die_width) / 2
+        self.left_die = Rect(self.dice.x + x_pad, die_y, die_width, die_width)
+        self.right_die = Rect(self.dice.x + (self.dice.width + x_pad) / 2, die_y,
+                              die_width, die_width)
+
+        self.placements = {}
+
+    @cached
+    def tiles(self, coords, aspect) -> list[tuple[Rect, Rect]]:
+        """returns the area of every tile, centered on the board by their axial coordinates,
+        and of the gen num in its middle"""
+        tile_width = self.tile_width
+        tile_height = aspect * tile_width
+        # gen nums are sized relative to the tiles that contain them
+        gen_num_width = tile_width / 3
+        gen_num_x_offset = (tile_width - gen_num_width) / 2
+        gen_num_y_offset = (tile_height - tile_height / 3) / 2
+
+        # coordinates of where to position central tile
+        board_x, board_y = center(self.board)
+        center_x = board_x - tile_width / 2
+        center_y = board_y - tile_height / 2
+
+        areas = []
+        for axial_x, axial_y in coords:
+            # Tiles above the midline need to be shifted right, likewise below shifted left.
+            # the axial_y / 2 term accounts for this shift. The reason for dividing by two is that
+            # the hexagon grid is staggered row to row for tesselation.
+            x = center_x + tile_width * (axial_x + axial_y / 2)
+
+            # If you picture the largest rectangle you could draw within a hexagon,
+            # the height of that rectangle is 1/2 the height of the whole shape
+            # the pointed section above this rectangle fits into the above row of hexagons.
+            # the height of this upper section is 1/4 of the shape's height, meaning
+            # the row coordinate must be scaled by 3/4
+            y = center_y + tile_height * (axial_y * 0.75)
+
+            areas.append((Rect(x, y, tile_width, tile_height),
+                           Rect(x + gen_num_x_offset, y + gen_num_y_offset,
+                                gen_num_width, gen_num_width)))
+        return areas
+
+    @cached
+    def vertex_centers(self, coords, aspect) -> list[tuple[float, float]]:
+        """returns the position of every vertex, around the tiles placed by tiles"""
+        centers = [None for _ in range(54)]
+        for index, (tile, _) in enumerate(self.tiles(coords, aspect)):
+            tile_width = tile.width * 1.05 # positions the vertices in a more suitable manner
+            x_center = tile.x + tile_width / 2
+            y_center = tile.y + tile.height / 2
+            for i in range(6):
+                vertex_index = TILE_ADJACENCY[index][i]
+                if centers[vertex_index] is None:
+                    angle = (i * math.pi / 3) - math.pi / 2
+                    centers[vertex_index] = (x_center + (tile_width / 2) * math.cos(angle),
+                                             y_center + (tile.height / 2) * math.sin(angle))
+        return centers
+
+    @cached
+    def cards(self, count, aspect) -> list[tuple[list[Rect], tuple[float, float]]]:
+        """returns, for count kinds of card in the hand five to a row, the area of each card
+        of a stack of five (top card first) and the center of the stack's count label"""
+        card_width = self.card_width
+        card_height = aspect * card_width
+        # just a little spacing to make things look more normal
+        padding = card_width / 30
+        # each card further down the stack is drawn a little up and to the right
+        stack_offset = card_width / 28
+        placements = []
+        for i in range(count):
+            x = self.hand.x + padding + card_width * (i % 5)
+            y = self.hand.y + padding + (card_height + padding * 5) * (i // 5)
+            stack = [Rect(x + depth * stack_offset, y + depth * stack_offset,
+                          card_width, card_height) for depth in range(5)]
+            placements.append((stack, (x + card_width * .75, y + card_height * .85)))
+        return placements
+
+    @cached
+    def bank_cards(self, aspect) -> list[tuple[Rect, tuple[float, float]]]:
+        """returns the area of each of the bank's five cards, in a row,
+        and the center of its count label"""
+        card_width = self.bank.width / 5
+        placements = []
+        for i in range(5):
+            card = Rect(self.bank.x + card_width * i, self.bank.y, card_width, aspect * card_width)
+            placements.append((card, label_corner(card)[0]))
+        return placements
+
+    @cached
+    def player_rows(self, count, aspects) -> list[tuple[Rect, list[tuple]]]:
+        """returns, for each of count players, the area of the color box of their row in the
+        player info panel and (area, label center, label background area) of each graphic
+        after it, one graphic per aspect"""
+        panel = self.player_info
+        card_width = self.card_width / 4 # looks more natural
+        padding = card_width / 30
+        rows = []
+        for p_num in range(count):
+            # rows run down from the top of the panel
+            y = panel.y + panel.height - (p_num + 1) * self.player_info_row
+            box = Rect(panel.x, y + card_width, card_width, card_width)
+            graphics = []
+            # each graphic is two card widths and three paddings further right
+            for graphic, aspect in enumerate(aspects):
+                x = panel.x + card_width * (1 + graphic * 2) + padding * 3 * (graphic + 1)
+                area = Rect(x, y, card_width * 2, aspect * card_width * 2)
+                graphics.append((area, *label_corner(area)))
+            rows.append((box, graphics))
+        return rows
+
+
+@lru_cache(maxsize=8)
+def get_layout(width, height) -> Layout:
+    """returns the layout for a window of the given size"""
+    return Layout(width, height)
+
+
+def center(rect) -> tuple[float, float]:
+    """returns the center point of a Rect"""
+    return rect.x + rect.width / 2, rect.y + rect.height / 2
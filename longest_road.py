@@ -0,0 +1,133 @@
+"""
+Incremental longest road calculation.
+Each player's roads are kept as connected components (an int bitset of edge ids each),
+along with the length of the longest road in every component.
+Only the components touched by a new road or a new settlement are recomputed.
+"""
+from board_config import EDGES, VERTEX_EDGE_MASKS
+
+
+class LongestRoad:
+    """
+    board: the Board whose roads are tracked
+    components: maps player_id to a tuple of (edge_mask, longest road length) pairs,
+        one pair per connected group of that player's roads
+    lengths: maps player_id to the length of that player's longest road
+    """
+    def __init__(self, board):
+        self.board = board
+        self.components = {}
+        self.lengths = {}
+
+    def snapshot(self):
+        """returns the cached components and lengths, see Board.snapshot"""
+        return tuple(self.components.items()), tuple(self.lengths.items())
+
+    def restore(self, snapshot):
+        """Return to the state captured by snapshot()"""
+        components, lengths = snapshot
+        self.components = dict(components)
+        self.lengths = dict(lengths)
+
+    def length(self, player) -> int:
+        """Returns the length of the given player's longest road"""
+        return self.lengths.get(player.player_id, 0)
+
+    def add_road(self, road):
+        """Merge a newly placed road into its owner's components"""
+        player = road.owner
+        merged = 1 << road.edge
+        kept = []
+        # the road joins every component it touches at an end that isn't blocked
+        touching = 0
+        for vertex_index in (road.vertex1, road.vertex2):
+            if not self.is_blocked(vertex_index, player):
+                touching |= VERTEX_EDGE_MASKS[vertex_index]
+        for mask, length in self.components.get(player.player_id, ()):
+            if mask & touching:
+                merged |= mask
+            else:
+                kept.append((mask, length))
+        kept.append((merged, self.longest_path(merged, player)))
+        self.set_components(player, kept)
+
+    def add_building(self, vertex_index):
+        """Split any other player's road that runs through a newly placed settlement"""
+        owner = self.board.vertices[vertex_index].owner
+        for player in self.board.players:
+            if player is owner:
+                continue
+            components = self.components.get(player.player_id, ())
+            touched = [component for component in components
+                       if component[0] & VERTEX_EDGE_MASKS[vertex_index]]
+            if not touched:
+                continue
+            kept = [component for component in components if component not in touched]
+            for mask, _ in touched:
+                for part in self.split(mask, player):
+                    kept.append((part, self.longest_path(part, player)))
+            self.set_components(player, kept)
+
+    def set_components(self, player, components):
+        """Store a player's components and cache their longest road"""
+        self.components[player.player_id] = tuple(components)
+        self.lengths[player.player_id] = max((length for _, length in components), default=0)
+
+    def is_blocked(self, vertex_index, player) -> bool:
+        """True if another player's building on the vertex breaks the player's road there"""
+        owner = self.board.vertices[vertex_index].owner
+        return owner is not None and owner is not player
+
+    def split(self, mask, player) -> list[int]:
+        """Divide the edges in mask into groups connected through unblocked vertices"""
+        parts = []
+        remaining = mask
+        while remaining:
+            part = 0
+            frontier = remaining & -remaining
+            while frontier:
+                part |= frontier
+                reached = 0
+                while frontier:
+                    low = frontier & -frontier
+                    frontier ^= low
+                    for vertex_index in EDGES[low.bit_length() - 1]:
+                        if not self.is_blocked(vertex_index, player):
+                            reached |= VERTEX_EDGE_MASKS[vertex_index]
+                frontier = reached & remaining & ~part
+            parts.append(part)
+            remaining &= ~part
+        return parts
+
+    def longest_path(self, mask, player) -> int:
+        """Length of the longest road (no edge used twice) within the edges in mask"""
+        is_blocked = self.is_blocked
+
+        def walk(vertex_index, used):
+            longest = 0
+            options = VERTEX_EDGE_MASKS[vertex_index] & mask & ~used
+            while options:
+                low = options & -options
+                options ^= low
+                vertex1, vertex2 = EDGES[low.bit_length() - 1]
+                other = vertex2 if vertex1 == vertex_index else vertex1
+                # a road can end at another player's building but not continue through it
+                if is_blocked(other, player):
+                    length = 1
+                else:
+                    length = 1 + walk(other, used | low)
+                if length > longest:
+                    longest = length
+            return longest
+
+        # every road ending at a blocked vertex is also found walking in from its other end,
+        # so only unblocked vertices need to be tried as starting points
+        starts = set()
+        remaining = mask
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            for vertex_index in EDGES[low.bit_length() - 1]:
+                if not is_blocked(vertex_index, player):
+                    starts.add(vertex_index)
+        return max((walk(vertex_index, 0) for vertex_index in starts), default=0)
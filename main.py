@@ -1,22 +1,82 @@
 """Runs a game of Catan between a single player and 3 AI"""
+import argparse
+
 import pyglet
 from render import Renderer
 import event_handler
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Catan against 3 AI")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="redraw at most this many times a second, "
+                             "by default the window is only drawn right after something changes")
+    parser.add_argument("--width", type=int, default=3000, help="starting width of the window")
+    parser.add_argument("--height", type=int, default=1500, help="starting height of the window")
+    parser.add_argument("--profile", action="store_true",
+                        help="start with the profiling overlay shown (F3 toggles it)")
+    parser.add_argument("--trace", default="frame_trace.json",
+                        help="file F4 writes a trace of the recent frames to")
+    args = parser.parse_args()
+
     config = pyglet.gl.Config(sample_buffers=1, samples=8, double_buffer=True)
-    window = pyglet.window.Window(config=config, width=3000, height=1500, caption="Catan")
+    window = pyglet.window.Window(config=config, width=args.width, height=args.height,
+                                  caption="Catan", resizable=True)
     renderer = Renderer(window)
+    if args.profile:
+        renderer.toggle_profiler()
+
+    def redraw(dt=0):
+        """Draw a frame, only if the game changed since the last one"""
+        if renderer.is_dirty():
+            window.draw(dt)
 
     @window.event
     def on_draw():
         """The on_draw method called by pyglet"""
         renderer.update()
 
+    @window.event
+    def on_expose():
+        """The window was uncovered or resized and must be drawn again"""
+        renderer.mark_dirty()
+        if args.fps is None:
+            redraw()
+
+    @window.event
+    def on_resize(width, height):
+        """Lay the game out again for the new window size"""
+        renderer.on_resize(width, height)
+        # returning nothing lets pyglet's own handler update the viewport
+
     @window.event
     def on_mouse_release(x, y, button, modifiers):
         """Whenever a mouse button is released this event is dispatched"""
         if button == pyglet.window.mouse.LEFT:
             event_handler.on_click(x, y, renderer)
+            if args.fps is None:
+                redraw()
+
+    @window.event
+    def on_key_press(symbol, modifiers):
+        """F3 shows the profiling overlay, F4 writes a trace of the frames it timed"""
+        if symbol == pyglet.window.key.F3:
+            renderer.toggle_profiler()
+            if args.fps is None:
+                redraw()
+        elif symbol == pyglet.window.key.F4:
+            renderer.profiler.dump_trace(args.trace)
+            print(f"wrote {len(renderer.profiler.trace)} frames to {args.trace}")
+
+    def load_assets(dt):
+        """Show the images that are loaded in the background as they arrive"""
+        if renderer.load_pending() and args.fps is None:
+            redraw(dt)
+        if renderer.is_loaded():
+            pyglet.clock.unschedule(load_assets)
 
-    pyglet.app.run()
+    pyglet.clock.schedule_interval(load_assets, 0.1)
+    if args.fps is not None:
+        # frame cap: changes are picked up on the next tick, so bursts of changes share a frame
+        pyglet.clock.schedule_interval(redraw, 1 / args.fps)
+    # the window is not redrawn on a timer, only by redraw
+    pyglet.app.run(None)
@@ -0,0 +1,414 @@
+"""
+Monte Carlo Tree Search AI.
+Every decision searches the moves of the whole game (every player's builds, and the dice as
+chance nodes) for as long as its time budget allows, playing each line out with the Board's
+random AI. Moves are made and unmade in place with the Board's undo log, so a rollout costs
+about as much as playing the turns, and the strength of the search grows with engine speed.
+"""
+import math
+import time
+
+from board_config import EDGES, BUILDING_COSTS, BUILDING_COST_COUNTS, \
+    VERTEX_EDGE_MASKS, ROLL_PROBABILITIES, Building
+from bitboard import iter_bits
+from game_state import TurnState
+from evaluator import SettlementEvaluator
+
+# moves are tuples: ('settlement', vertex), ('city', vertex), ('road', vertex1, vertex2),
+# ('trade', building) to trade with the bank until the building is affordable,
+# and END to end the turn
+END = ('end',)
+
+# how much a point of expected production per roll is worth against a victory point
+# when scoring a game the rollout didn't finish
+PRODUCTION_WEIGHT = 3.0
+
+
+def building_spots(board, player, action) -> list[int]:
+    """returns the vertices where the player can build ('settlement' or 'city') right now"""
+    tags = board.game_state.tags
+    tags[action] = True
+    spots = board.get_clickable_vertices()
+    tags[action] = False
+    return spots
+
+
+def road_spots(board, player) -> list[tuple[int, int]]:
+    """returns the (vertex1, vertex2) of every edge the player can build a road on right now"""
+    state = board.game_state
+    if player.numRoads == 0:
+        return []
+    edges = board.bitboard.road_edges(player.player_id)
+    if state.is_start_phase():
+        # the road must touch the settlement just placed
+        settle_index = state.placed_settlement()
+        if settle_index is None:
+            return []
+        edges &= VERTEX_EDGE_MASKS[settle_index]
+    elif not player.can_afford(Building.ROAD):
+        return []
+    return [EDGES[edge] for edge in iter_bits(edges)]
+
+
+def can_trade_for(board, player, building) -> bool:
+    """True if the player can't afford the building,
+    but Board.ai_trade can trade surplus cards with the bank until they can"""
+    cost = BUILDING_COST_COUNTS[building]
+    short = 0
+    trades = 0
+    for value, count in enumerate(player.resources):
+        if count < cost[value]:
+            if board.resource_bank[value] < cost[value] - count:
+                return False
+            short += cost[value] - count
+        else:
+            trades += (count - cost[value]) // 4
+    return 0 < short <= trades
+
+
+def legal_moves(board) -> list[tuple]:
+    """returns the moves the current player can choose between.
+    Empty while the dice are about to be rolled, see is_chance"""
+    state = board.game_state
+    player = state.get_current_player()
+    if state.is_start_phase():
+        # a settlement, then a road touching it
+        if state.tags['settlements_placed_turn'] == 0:
+            return [('settlement', spot) for spot in building_spots(board, player, 'settlement')]
+        return [('road', *edge) for edge in road_spots(board, player)]
+    if state.state is not TurnState.BUILDING:
+        return []
+
+    # the clickable vertices don't check the pieces the player has left, place_building does
+    moves = []
+    if player.numCities > 0:
+        moves += [('city', spot) for spot in building_spots(board, player, 'city')]
+    if player.numSettlements > 0:
+        moves += [('settlement', spot) for spot in building_spots(board, player, 'settlement')]
+    moves += [('road', *edge) for edge in road_spots(board, player)]
+    for building in (Building.CITY, Building.SETTLEMENT, Building.ROAD):
+        if can_trade_for(board, player, building):
+            moves.append(('trade', building))
+    moves.append(END)
+    return moves
+
+
+def is_chance(board) -> bool:
+    """True if the next thing to happen is the current player rolling the dice"""
+    state = board.game_state
+    return not state.is_start_phase() and state.state is TurnState.BEFORE_ROLL
+
+
+def roll(board, dice):
+    """Roll the given dice for the current player and start their building phase"""
+    state = board.game_state
+    state.roll_dice()
+    board.start_turn(state.get_current_player(), dice)
+    state.start_building_phase()
+
+
+def apply_move(board, move):
+    """Make a move for the current player, as returned by legal_moves"""
+    state = board.game_state
+    player = state.get_current_player()
+    kind = move[0]
+    if state.is_start_phase():
+        # the first two settlements and roads are free, see Board.ai_start_turn
+        if kind == 'settlement':
+            board.add_resources(player, BUILDING_COSTS[Building.SETTLEMENT])
+            board.place_building(Building.SETTLEMENT, player, move[1])
+            state.tags['settlement_pos'] = move[1]
+        else:
+            board.add_resources(player, BUILDING_COSTS[Building.ROAD])
+            board.place_road(player, move[1], move[2])
+            # the road ends the turn
+            if state.end_turn_start_phase():
+                resources = board.get_resources_from_vertex(state.tags['settlement_pos'])
+                board.add_resources(player, resources)
+    elif kind == 'city':
+        board.place_building(Building.CITY, player, move[1])
+    elif kind == 'settlement':
+        board.place_building(Building.SETTLEMENT, player, move[1])
+    elif kind == 'road':
+        board.place_road(player, move[1], move[2])
+    elif kind == 'trade':
+        board.ai_trade(player, move[1])
+    else:
+        state.end_turn()
+
+
+def chance_key(board, dice):
+    """returns the chance node child a roll leads to. Rolls pay out the same way for the
+    same sum, except 7s, where the cards discarded are random and become part of the key"""
+    total = dice[0] + dice[1]
+    if total != 7:
+        return total
+    return (total, tuple(tuple(player.resources) for player in board.players))
+
+
+def production(board) -> list[float]:
+    """returns every player's expected number of resource cards per roll"""
+    expected = [0.0] * len(board.players)
+    for total, payouts in enumerate(board.roll_payouts):
+        for _, vertex_index in payouts:
+            expected[board.vertices[vertex_index].owner.player_id] += ROLL_PROBABILITIES[total]
+    return expected
+
+
+def evaluate(board) -> list[float]:
+    """returns how good the position is for every player, from 0 to 1.
+    1 for the winner of a finished game, otherwise each player's share
+    of the victory points and production on the board"""
+    winner = board.get_winner()
+    if winner is not None:
+        return [1.0 if player is winner else 0.0 for player in board.players]
+    scores = [player.vps + PRODUCTION_WEIGHT * expected
+              for player, expected in zip(board.players, production(board))]
+    total = sum(scores)
+    if total == 0:
+        return [1 / len(scores)] * len(scores)
+    return [score / total for score in scores]
+
+
+class Node:
+    """
+    player_id: player choosing the move at this node, None for a chance node
+    moves: moves not tried from here yet
+    children: maps each tried move (or chance_key for a chance node) to its Node
+    visits: number of times the search passed through this node
+    value: total reward of those visits, for the player who chose the move leading here
+    """
+    __slots__ = ("player_id", "moves", "children", "visits", "value")
+
+    def __init__(self, board):
+        if is_chance(board) or board.get_winner() is not None:
+            self.player_id = None
+            self.moves = []
+        else:
+            self.player_id = board.game_state.current_player_index
+            self.moves = legal_moves(board)
+            board.rng.shuffle(self.moves)
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, exploration) -> tuple:
+        """returns the (move, child) with the best upper confidence bound"""
+        log_visits = math.log(self.visits)
+        best = None
+        best_bound = -1.0
+        for move, child in self.children.items():
+            bound = child.value / child.visits + \
+                exploration * math.sqrt(log_visits / child.visits)
+            if bound > best_bound:
+                best = (move, child)
+                best_bound = bound
+        return best
+
+
+class MCTSPolicy:
+    """
+    Plays each decision by Monte Carlo Tree Search.
+    time_budget: seconds of search per decision
+    iterations: stop after this many rollouts instead, so searches are reproducible
+    rollout_turns: main phase turns each rollout plays before the position is scored
+    exploration: UCT exploration constant
+    table: optional zobrist.TranspositionTable of the rewards of the positions rolled out from.
+           A leaf reached again, by any order of moves, reuses them once it has table_samples
+    pips: rollouts settle the spots an evaluator.SettlementEvaluator scores best
+          instead of random ones
+    rollouts, search_time: totals over every search, see rollouts_per_second
+    """
+    name = "mcts"
+
+    def __init__(self, time_budget=0.05, iterations=None, rollout_turns=8, exploration=0.7,
+                 table=None, table_samples=4, pips=False):
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollout_turns = rollout_turns
+        self.exploration = exploration
+        self.table = table
+        self.table_samples = table_samples
+        self.pips = pips
+        # the SettlementEvaluator of the board last rolled out on, see evaluator_for
+        self.evaluator = None
+        self.rollouts = 0
+        self.search_time = 0.0
+
+    def rollouts_per_second(self) -> float:
+        """returns the average number of rollouts played a second while searching"""
+        return self.rollouts / self.search_time if self.search_time > 0 else 0.0
+
+    def start_turn(self, board, player):
+        """Place a settlement and road during the start phase"""
+        moves = legal_moves(board)
+        if not moves:
+            # nowhere to settle, let the built in AI end the turn
+            board.ai_start_turn(player)
+            return
+        apply_move(board, self.choose(board, moves))
+        # the road ends the turn
+        moves = legal_moves(board)
+        if moves:
+            apply_move(board, self.choose(board, moves))
+        else:
+            board.game_state.end_turn_start_phase()
+
+    def turn(self, board, player):
+        """Roll, then build until the search picks ending the turn"""
+        roll(board, None)
+        move = None
+        while move != END:
+            # nothing is left to decide once someone has won
+            moves = legal_moves(board) if board.get_winner() is None else [END]
+            move = self.choose(board, moves)
+            apply_move(board, move)
+
+    def choose(self, board, moves) -> tuple:
+        """returns the move to make, searching only if there is a choice"""
+        if len(moves) == 1:
+            return moves[0]
+        return self.search(board)
+
+    def search(self, board) -> tuple:
+        """returns the most visited move from the current position"""
+        stats = self.root_stats(board)
+        return max(stats, key=lambda move: stats[move][0])
+
+    def root_stats(self, board) -> dict:
+        """returns (visits, value) of every move searched from the current position"""
+        root = self.grow(board)
+        return {move: (child.visits, child.value) for move, child in root.children.items()}
+
+    def grow(self, board) -> Node:
+        """Search from the current position until the budget runs out. returns the root of the tree"""
+        undo_log = board.undo_log
+        enabled = undo_log.enabled
+        undo_log.enabled = True
+        mark = undo_log.mark()
+        # searching must not change the dice the real game rolls
+        rng_state = board.rng.getstate()
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        if self.table is not None:
+            self.table.new_search()
+        root = Node(board)
+        iterations = 0
+        while True:
+            iterations += self.expand(board, root, mark)
+            if self.iterations is not None:
+                if iterations >= self.iterations:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+
+        self.rollouts += iterations
+        self.search_time += time.perf_counter() - start
+        board.rng.setstate(rng_state)
+        undo_log.enabled = enabled
+        return root
+
+    def expand(self, board, root, mark) -> int:
+        """Play one rollout from a new leaf of the tree and back up its result.
+        returns the number of rollouts played"""
+        path = self.descend(board, root)
+        rewards = self.evaluate_leaf(board)
+        board.undo_log.undo(mark)
+        self.backup(path, rewards)
+        return 1
+
+    def descend(self, board, root) -> list[Node]:
+        """Walk down the tree making moves on the board until a node is added (or the game ends).
+        returns the nodes walked through, starting with root"""
+        path = [root]
+        node = root
+        while True:
+            if node.player_id is None:
+                if board.get_winner() is not None:
+                    break
+                # chance node, the dice pick the child
+                dice = (board.rng.randint(1, 6), board.rng.randint(1, 6))
+                roll(board, dice)
+                key = chance_key(board, dice)
+                child = node.children.get(key)
+                if child is None:
+                    child = node.children[key] = Node(board)
+                    path.append(child)
+                    break
+            elif node.moves:
+                # expand an untried move
+                move = node.moves.pop()
+                apply_move(board, move)
+                child = node.children[move] = Node(board)
+                path.append(child)
+                break
+            elif node.children:
+                move, child = node.select(self.exploration)
+                apply_move(board, move)
+            else:
+                break
+            path.append(child)
+            node = child
+        return path
+
+    @staticmethod
+    def visit(path):
+        """Count a visit to every node on the path"""
+        for node in path:
+            node.visits += 1
+
+    def backup(self, path, rewards, visited=False):
+        """Add the rewards of a rollout to the nodes on the path.
+        visited: the visits were already counted when the path was walked, see visit"""
+        if not visited:
+            self.visit(path)
+        # each node's value is from the point of view of the player who chose the move into it.
+        # the dice pick the children of chance nodes, so their values are never used
+        for parent, child in zip(path, path[1:]):
+            if parent.player_id is not None:
+                child.value += rewards[parent.player_id]
+
+    def evaluate_leaf(self, board) -> list[float]:
+        """returns the rewards of the position, from a rollout or the transposition table"""
+        if self.table is None:
+            return self.rollout(board)
+        key = board.position_key()
+        # (total rewards, number of rollouts) of the position
+        entry = self.table.get(key)
+        if entry is not None and entry[1] >= self.table_samples:
+            return [total / entry[1] for total in entry[0]]
+        rewards = self.rollout(board)
+        if entry is None:
+            entry = ([0.0] * len(rewards), 0)
+        totals = [total + reward for total, reward in zip(entry[0], rewards)]
+        self.table.put(key, (totals, entry[1] + 1), weight=entry[1] + 1)
+        return rewards
+
+    def rollout(self, board) -> list[float]:
+        """Play the game on with the random AI for rollout_turns turns and score it"""
+        state = board.game_state
+        # finish the turn in progress
+        if state.is_start_phase() and state.tags['settlements_placed_turn'] == 1:
+            spots = road_spots(board, state.get_current_player())
+            if spots:
+                apply_move(board, ('road', *board.rng.choice(spots)))
+        elif not state.is_start_phase() and state.state is TurnState.BUILDING:
+            state.end_turn()
+
+        evaluator = self.evaluator_for(board)
+        while state.is_start_phase():
+            board.ai_start_turn(state.get_current_player(), evaluator)
+        for _ in range(self.rollout_turns):
+            if board.get_winner() is not None:
+                break
+            board.ai_turn(state.get_current_player(), evaluator)
+        return evaluate(board)
+
+    def evaluator_for(self, board):
+        """returns the SettlementEvaluator rollouts on the board use, None to play at random"""
+        if not self.pips:
+            return None
+        if self.evaluator is None or self.evaluator.board is not board:
+            self.evaluator = SettlementEvaluator(board)
+        return self.evaluator
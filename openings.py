@@ -0,0 +1,319 @@
+"""
+Opening book for the start phase.
+The book maps a start phase position to the settlements and roads to place, so strong openings
+are worked out once, offline, instead of every game. A position is keyed by the layout of the
+tiles, the seat of the player to move and the vertices they have built on, so every seat has an
+entry for its first placement and one for its second after each first spot the book plays.
+The other seats' settlements aren't part of the key: each entry ranks its moves, and the best
+one the distance rule still allows is played. Looking a position up is a single dict access.
+
+A book is made from samples of (key, settlement, road edge, reward), like those played out by
+build_book: the best candidate spots (by pip count) of every entry are each played to the end
+of games in which the other seats place like the pips or the random AI, and the moves are
+ranked by how often they win, followed by the next best spots by pip count for when those
+are taken. Books for several layouts, like those dealt by Board.shuffle_layout, can be built
+into one file.
+
+The file holds a header followed by an ENTRY for every position, each followed by its MOVEs.
+
+usage: python openings.py --games 8 --out openings.book [--layouts 10 --seed 0]
+"""
+import argparse
+import hashlib
+import os
+import random
+import struct
+import time
+from functools import lru_cache
+
+from board import Board
+from board_config import EDGES, EDGE_INDEX, VERTEX_EDGE_MASKS, VERTEX_NEIGHBOR_MASKS, NUM_PLAYERS
+from bitboard import iter_bits
+from evaluator import SettlementEvaluator
+from mcts import apply_move, evaluate, road_spots
+
+# the book shipped next to this file, built for the beginner layout
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openings.book")
+
+# magic bytes and number of entries
+HEADER = struct.Struct("<4sI")
+MAGIC = b"CBK2"
+# layout key, seat of the mover, the mover's vertices, number of moves
+ENTRY = struct.Struct("<QBQB")
+# settlement vertex, road edge
+MOVE = struct.Struct("<BB")
+
+
+def layout_key(board) -> int:
+    """returns a 64 bit hash of the resources and numbers of the tiles,
+    the same in every process (unlike hash())"""
+    layout = bytes(value for tile in board.tiles
+                   for value in (tile.resource.value, tile.gen_num))
+    return int.from_bytes(hashlib.blake2b(layout, digest_size=8).digest(), "little")
+
+
+def opening_key(board, layout=None) -> tuple[int, int, int]:
+    """returns the book key of the position: (layout key, seat of the player to move,
+    vertices of the player to move). layout can be passed in if already known"""
+    player_id = board.game_state.current_player_index
+    if layout is None:
+        layout = layout_key(board)
+    return layout, player_id, board.bitboard.buildings(player_id)
+
+
+class OpeningBook:
+    """
+    entries: maps opening_key to the (settlement vertex, road edge) moves to play, best first
+    hits, misses: lookups that found / didn't find a move
+    """
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        # (Board.layout, layout key) of the board last looked up, to hash each layout once
+        self.layout = (None, None)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, board):
+        """returns the (settlement vertex, road edge) to play: the best of the position's moves
+        the distance rule allows. None if the position isn't in the book or none is allowed"""
+        # compared by contents, so a board dealt a new layout (see Board.shuffle_layout)
+        # never reuses the key of the old one
+        if self.layout[0] != board.layout:
+            self.layout = (board.layout, layout_key(board))
+        free = board.bitboard.free_vertices()
+        move = next((move for move in self.entries.get(opening_key(board, self.layout[1]), ())
+                     if free >> move[0] & 1), None)
+        if move is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return move
+
+    def play(self, board, player) -> bool:
+        """Place the book's settlement and road for the current player.
+        returns False, having placed nothing, if the book has no move for the position"""
+        state = board.game_state
+        if not state.is_start_phase() or state.tags['settlements_placed_turn'] != 0:
+            return False
+        move = self.lookup(board)
+        if move is None:
+            return False
+        vertex, edge = move
+        apply_move(board, ('settlement', vertex))
+        spots = road_spots(board, player)
+        if EDGES[edge] not in spots:
+            # someone else's road took the edge since, settle for another one
+            edge = EDGE_INDEX[board.rng.choice(spots)] if spots else None
+        if edge is None:
+            state.end_turn_start_phase()
+        else:
+            apply_move(board, ('road', *EDGES[edge]))
+        return True
+
+    def update(self, other):
+        """Add every entry of another book, replacing any for the same position"""
+        self.entries.update(other.entries)
+
+    def save(self, path):
+        """Write the book to path"""
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(self.entries)))
+            for (layout, seat, own), moves in self.entries.items():
+                file.write(ENTRY.pack(layout, seat, own, len(moves)))
+                for vertex, edge in moves:
+                    file.write(MOVE.pack(vertex, edge))
+
+    @classmethod
+    def load(cls, path):
+        """returns the book written to path by save"""
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        entries = {}
+        offset = HEADER.size
+        try:
+            for _ in range(count):
+                layout, seat, own, length = ENTRY.unpack_from(data, offset)
+                offset += ENTRY.size
+                entries[(layout, seat, own)] = tuple(MOVE.unpack_from(data, offset + i * MOVE.size)
+                                                     for i in range(length))
+                offset += length * MOVE.size
+        except struct.error as error:
+            raise ValueError(f"{path} is truncated, expected {count} entries") from error
+        return cls(entries)
+
+    @classmethod
+    def from_results(cls, samples, min_samples=1):
+        """returns a book ranking the moves of every position in the samples.
+        samples are (key, settlement vertex, road edge, reward) tuples, moves are ranked by their
+        average reward and need min_samples to be considered. Each settlement vertex is ranked
+        once, with its best road"""
+        totals = {}
+        for key, vertex, edge, reward in samples:
+            total, count = totals.get((key, vertex, edge), (0.0, 0))
+            totals[(key, vertex, edge)] = (total + reward, count + 1)
+        # (average, road edge) of the best road of every settlement vertex of every position
+        best = {}
+        for (key, vertex, edge), (total, count) in totals.items():
+            if count < min_samples:
+                continue
+            average = total / count
+            spots = best.setdefault(key, {})
+            if vertex not in spots or average > spots[vertex][0]:
+                spots[vertex] = (average, edge)
+        return cls({key: tuple((vertex, edge) for vertex, (_, edge) in
+                               sorted(spots.items(), key=lambda item: -item[1][0]))
+                    for key, spots in best.items()})
+
+
+@lru_cache(maxsize=None)
+def load_book(path=DEFAULT_BOOK) -> OpeningBook:
+    """returns the book at path, loaded once per process. An empty book if there is no file"""
+    try:
+        return OpeningBook.load(path)
+    except FileNotFoundError:
+        return OpeningBook()
+
+
+def make_board(layout_seed=None, seed=None) -> Board:
+    """returns a new Board, with its tiles dealt by layout_seed if given one"""
+    board = Board(seed=seed)
+    if layout_seed is not None:
+        board.shuffle_layout(random.Random(layout_seed))
+    return board
+
+
+def play_on(board, evaluator, turns):
+    """Finish the start phase and play the given number of main phase turns with the pips AI.
+    returns how good the position then is for every player, see mcts.evaluate"""
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player(), evaluator)
+    for _ in range(turns):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player(), evaluator)
+    return evaluate(board)
+
+
+def candidate_spots(board, evaluator, count, first=None) -> list[int]:
+    """returns the count free vertices with the best pip count,
+    leaving out those next to first if given a vertex"""
+    free = board.bitboard.free_vertices()
+    if first is not None:
+        free &= ~(1 << first | VERTEX_NEIGHBOR_MASKS[first])
+    scores = evaluator.masked_scores()
+    spots = list(iter_bits(free))
+    spots.sort(key=lambda vertex: -scores[vertex])
+    return spots[:count]
+
+
+def trial(layout_seed, seat, moves, turns, rng):
+    """Play a game in which the seat places its first settlements and roads by moves (then
+    like the pips AI), and the other seats each place like the pips or the random AI, picked
+    at random. returns the seat's reward at the end (see play_on), None if a move wasn't allowed"""
+    board = make_board(layout_seed, seed=rng.getrandbits(64))
+    evaluator = SettlementEvaluator(board)
+    state = board.game_state
+    placed = 0
+    while state.is_start_phase():
+        player = state.get_current_player()
+        if state.current_player_index != seat:
+            board.ai_start_turn(player, evaluator if rng.random() < 0.5 else None)
+            continue
+        if placed == len(moves):
+            board.ai_start_turn(player, evaluator)
+            continue
+        vertex, edge = moves[placed]
+        if (not board.bitboard.free_vertices() >> vertex & 1
+                or board.bitboard.taken_edges() >> edge & 1):
+            return None
+        apply_move(board, ('settlement', vertex))
+        apply_move(board, ('road', *EDGES[edge]))
+        placed += 1
+    return play_on(board, evaluator, turns)[seat]
+
+
+def build_book(games=8, candidates=6, depth=20, turns=500, layout_seed=None, seed=0, book=None):
+    """Work out the openings of every seat on one layout: the first placement, then the second
+    after each first spot the book may play. Each road of each of the candidates best spots by
+    pip count is played on games times, see trial, and those spots are ranked by their average
+    reward. The next best spots by pip count follow them, up to depth spots, for when the
+    better ones are taken. returns the book with the new entries added and the samples
+    they were ranked by"""
+    book = book if book is not None else OpeningBook()
+    rng = random.Random(seed)
+    samples = []
+
+    def rank(key, spots, first_moves):
+        """returns the moves of key, ranked, after the seat's first_moves"""
+        _, seat, _ = key
+        for vertex in spots[:candidates]:
+            for edge in iter_bits(VERTEX_EDGE_MASKS[vertex]):
+                played = 0
+                # the other seats may take the spot first, so some trials don't count
+                for _ in range(games * 3):
+                    reward = trial(layout_seed, seat, first_moves + [(vertex, edge)], turns, rng)
+                    if reward is not None:
+                        samples.append((key, vertex, edge, reward))
+                        played += 1
+                        if played == games:
+                            break
+        ranked = OpeningBook.from_results(sample for sample in samples
+                                          if sample[0] == key).entries.get(key, ())
+        played = {vertex for vertex, _ in ranked}
+        # the rest are played with any of their roads, see OpeningBook.play
+        return ranked + tuple((vertex, min(iter_bits(VERTEX_EDGE_MASKS[vertex])))
+                              for vertex in spots if vertex not in played)
+
+    board = make_board(layout_seed)
+    evaluator = SettlementEvaluator(board)
+    layout = layout_key(board)
+    for seat in range(NUM_PLAYERS):
+        first_key = (layout, seat, 0)
+        book.entries[first_key] = rank(first_key, candidate_spots(board, evaluator, depth), [])
+        for first in book.entries[first_key]:
+            second_key = (layout, seat, 1 << first[0])
+            spots = candidate_spots(board, evaluator, depth, first[0])
+            book.entries[second_key] = rank(second_key, spots, [first])
+    return book, samples
+
+
+def main():
+    """Build the opening book of the beginner layout, and of --layouts random layouts,
+    and write it to --out"""
+    parser = argparse.ArgumentParser(description="Build an opening book by simulation")
+    parser.add_argument("--games", type=int, default=8,
+                        help="games played from every candidate placement")
+    parser.add_argument("--candidates", type=int, default=6,
+                        help="spots with the best pip count played on for every placement")
+    parser.add_argument("--depth", type=int, default=20,
+                        help="spots ranked for every placement, for when the best are taken")
+    parser.add_argument("--turns", type=int, default=500,
+                        help="main phase turns played before an unfinished game is scored")
+    parser.add_argument("--layouts", type=int, default=0,
+                        help="also build books for this many random layouts")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the games and layouts")
+    parser.add_argument("--out", default=DEFAULT_BOOK, help="file to write the book to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # the beginner layout, then random ones
+    layouts = [None] + [args.seed + i for i in range(args.layouts)]
+    book = OpeningBook()
+    for layout_seed in layouts:
+        book, samples = build_book(args.games, args.candidates, args.depth, args.turns,
+                                   layout_seed, args.seed, book)
+        print(f"layout {'beginner' if layout_seed is None else layout_seed}: "
+              f"{len(samples)} games, {len(book)} entries in the book")
+    book.save(args.out)
+    print(f"wrote {len(book)} entries to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Tree search spread over a pool of worker processes.
+Each worker keeps its own Board for the whole run, and is brought up to date with
+Board.snapshot() (a flat tuple of small immutable values), so no Board or Player object
+is pickled per move. Two ways of splitting the work are offered:
+
+root: every worker grows its own tree from the current position for the whole time budget,
+      and the visits of the root's moves are added up (root parallelization).
+leaf: the parent keeps the only tree and hands a batch of new leaves to the workers
+      to play out at once, with a virtual visit spreading each batch over different leaves.
+
+Workers of a multiprocessing pool can't start pools of their own, so inside the game farm
+(or with a single worker) the search runs in the calling process like MCTSPolicy.
+"""
+import atexit
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from board import Board
+from mcts import MCTSPolicy
+
+# pools shared by every policy with the same settings,
+# keyed by (workers, rollout_turns, exploration). Closed by shutdown_pools
+_POOLS = {}
+
+# the Board and policy of this worker process, set by _worker_init
+_BOARD = None
+_POLICY = None
+
+
+def _worker_init(rollout_turns, exploration):
+    """Runs once in each worker process. Creates the Board kept up to date by _sync."""
+    global _BOARD, _POLICY
+    _BOARD = Board()
+    _POLICY = MCTSPolicy(rollout_turns=rollout_turns, exploration=exploration)
+
+
+def _sync(snapshot, seed):
+    """Bring the worker's Board to the given position. Only what differs is changed"""
+    _BOARD.restore(snapshot)
+    _BOARD.rng.seed(seed)
+
+
+def _search_root(task):
+    """Grow a tree in a worker. returns the stats of the root's moves and the rollouts played"""
+    snapshot, seed, time_budget, iterations = task
+    _sync(snapshot, seed)
+    _POLICY.time_budget = time_budget
+    _POLICY.iterations = iterations
+    rollouts = _POLICY.rollouts
+    stats = _POLICY.root_stats(_BOARD)
+    return stats, _POLICY.rollouts - rollouts
+
+
+def _rollout(task):
+    """Play one leaf out in a worker. returns the rewards of every player"""
+    snapshot, seed = task
+    _sync(snapshot, seed)
+    return _POLICY.rollout(_BOARD)
+
+
+def get_pool(workers, rollout_turns, exploration):
+    """returns a pool of worker processes, started the first time it is asked for"""
+    key = (workers, rollout_turns, exploration)
+    if key not in _POOLS:
+        _POOLS[key] = Pool(workers, initializer=_worker_init,
+                           initargs=(rollout_turns, exploration))
+    return _POOLS[key]
+
+
+def shutdown_pools():
+    """Close every pool started by get_pool and wait for its workers to exit.
+    Runs when the interpreter exits, and can be called earlier to free the workers"""
+    while _POOLS:
+        _, pool = _POOLS.popitem()
+        pool.close()
+        pool.join()
+
+
+atexit.register(shutdown_pools)
+
+
+class ParallelMCTSPolicy(MCTSPolicy):
+    """
+    MCTSPolicy that plays its rollouts in a pool of worker processes.
+    workers: number of worker processes (defaults to one per core)
+    mode: 'root' or 'leaf', see the module docstring
+    rng: picks the seed of every worker's rollouts, so the real game's dice are untouched
+    """
+    mode = "root"
+
+    def __init__(self, time_budget=0.05, iterations=None, rollout_turns=8, exploration=0.7,
+                 workers=None, mode=None, seed=None):
+        super().__init__(time_budget, iterations, rollout_turns, exploration)
+        self.workers = workers or os.cpu_count() or 1
+        if mode is not None:
+            self.mode = mode
+        if self.mode not in ("root", "leaf"):
+            raise ValueError(f"unknown parallel mode '{self.mode}', expected 'root' or 'leaf'")
+        self.rng = random.Random(seed)
+
+    def pool(self):
+        """returns the pool to search with, None to search in this process"""
+        if self.workers <= 1 or multiprocessing.current_process().daemon:
+            return None
+        return get_pool(self.workers, self.rollout_turns, self.exploration)
+
+    def root_stats(self, board) -> dict:
+        """returns (visits, value) of every move searched from the current position"""
+        pool = self.pool()
+        if pool is None or self.mode == "leaf":
+            return super().root_stats(board)
+
+        start = time.perf_counter()
+        snapshot = board.snapshot()
+        iterations = None
+        if self.iterations is not None:
+            # split the rollouts between the workers
+            iterations = -(-self.iterations // self.workers)
+        tasks = [(snapshot, self.rng.getrandbits(64), self.time_budget, iterations)
+                 for _ in range(self.workers)]
+        merged = {}
+        for stats, rollouts in pool.imap_unordered(_search_root, tasks):
+            self.rollouts += rollouts
+            for move, (visits, value) in stats.items():
+                total_visits, total_value = merged.get(move, (0, 0.0))
+                merged[move] = (total_visits + visits, total_value + value)
+        self.search_time += time.perf_counter() - start
+        return merged
+
+    def expand(self, board, root, mark) -> int:
+        """Add a batch of leaves to the tree, one per worker, and play them out in the pool.
+        returns the number of rollouts played"""
+        pool = self.pool()
+        if pool is None:
+            return super().expand(board, root, mark)
+
+        paths = []
+        tasks = []
+        for _ in range(self.workers):
+            path = self.descend(board, root)
+            # counting the visit now makes the next descent prefer other leaves
+            self.visit(path)
+            paths.append(path)
+            tasks.append((board.snapshot(), self.rng.getrandbits(64)))
+            board.undo_log.undo(mark)
+        for path, rewards in zip(paths, pool.map(_rollout, tasks)):
+            self.backup(path, rewards, visited=True)
+        return len(paths)
+
+
+class RootParallelMCTSPolicy(ParallelMCTSPolicy):
+    """ParallelMCTSPolicy where every worker grows its own tree"""
+    name = "mcts-root"
+    mode = "root"
+
+
+class LeafParallelMCTSPolicy(ParallelMCTSPolicy):
+    """ParallelMCTSPolicy that plays batches of leaves of one tree out in the workers"""
+    name = "mcts-leaf"
+    mode = "leaf"
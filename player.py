@@ -1,19 +1,18 @@
 """Class that represents a player in the Catan game"""
-import copy
-
 from texture_enums import Resource
+from board_config import NUM_RESOURCES, BUILDING_COST_COUNTS, count_resources
 
 class Player:
     """
     player_id: unique int
     color: unique color
-    resource_cards: list of resource cards
+    resources: number of each resource card in hand, indexed by Resource.value
     dev_cards: list of development cards
     """
     def __init__(self, player_id, color, is_user):
         self.player_id = player_id
         self.color = color
-        self.resources = []
+        self.resources = [0] * NUM_RESOURCES
         self.dev_cards = []
         self.vps = 0
         self.numRoads = 15
@@ -21,23 +20,43 @@ class Player:
         self.numSettlements = 5
         self.numKnights = 0
         self.is_user = is_user
+        # total number of resource cards this player has drawn from the bank
+        self.resources_drawn = 0
+
+    def snapshot(self):
+        """returns the player's mutable state as a tuple, see Board.snapshot"""
+        return (tuple(self.resources), tuple(self.dev_cards), self.vps, self.numRoads,
+                self.numCities, self.numSettlements, self.numKnights, self.resources_drawn)
+
+    def restore(self, snapshot):
+        """Return the player to the state captured by snapshot()"""
+        (resources, dev_cards, self.vps, self.numRoads, self.numCities,
+         self.numSettlements, self.numKnights, self.resources_drawn) = snapshot
+        self.resources[:] = resources
+        self.dev_cards[:] = dev_cards
 
     def has_resources(self, resources: list[Resource]):
         """Returns true if the player has the resources in the quantities supplied"""
-        availible = copy.deepcopy(self.resources)
-        availible = [Resource(res.value) for res in availible]
-        for resource in resources:
-            if resource in availible:
-                availible.remove(resource)
-            else:
+        for held, needed in zip(self.resources, count_resources(resources)):
+            if held < needed:
                 return False
- 
         return True
 
+    def can_afford(self, building):
+        """Returns true if the player has the resources to pay for the given Building"""
+        for held, needed in zip(self.resources, BUILDING_COST_COUNTS[building]):
+            if held < needed:
+                return False
+        return True
+
+    def resource_count(self):
+        """Returns the number of resource cards in the player's hand"""
+        return sum(self.resources)
+
     def remove_resource(self, resource):
         """Removes an instance of a resource from the player's hand if available."""
-        if resource in self.resources:
-            self.resources.remove(resource)
+        if self.resources[resource.value] > 0:
+            self.resources[resource.value] -= 1
             return True
         return False
 
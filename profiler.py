@@ -0,0 +1,185 @@
+"""
+Frame profiler for the renderer.
+Times the sections of Renderer.update and each layer of the batch, counts draw calls and
+the labels, shapes and sprites created during a frame, and keeps a rolling window of frame times.
+The recent frames can be dumped as a trace file for chrome://tracing or https://ui.perfetto.dev.
+When disabled it does no timing, so it can stay wired into the renderer.
+Only pyglet's public API is used: the layers time themselves (see LayerGroup), draw calls are
+counted from the batch's group tree, and the renderer reports what it creates (see allocated).
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pyglet
+from pyglet.gl import glFinish
+
+# kinds of object whose creation is counted while profiling, see FrameProfiler.allocated
+ALLOCATED_KINDS = ("labels", "shapes", "sprites")
+
+
+def percentile(values, fraction) -> float:
+    """returns the value at the given fraction (0 to 1) of the sorted values, 0 if there are none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def count_draw_calls(batch) -> int:
+    """returns the draw calls Batch.draw makes, one for each vertex domain
+    in use by a visible group"""
+    def visit(group):
+        if not group.visible:
+            return 0
+        calls = sum(not domain.is_empty for domain in batch.group_map.get(group, {}).values())
+        return calls + sum(visit(child) for child in batch.group_children.get(group, ()))
+    return sum(visit(group) for group in batch.top_groups)
+
+
+class LayerGroup(pyglet.graphics.Group):
+    """
+    A top level group of a batch, one layer of the scene. While its profiler times a frame,
+    drawing the layer (and every group in it) is timed as a section of the frame.
+    profiler: the FrameProfiler timing the layer
+    name: section name of the layer, several layers may share one
+    """
+    def __init__(self, profiler, name, order=0, parent=None):
+        super().__init__(order=order, parent=parent)
+        self.profiler = profiler
+        self.name = name
+        # when the layer started drawing, None if it isn't being timed
+        self.start = None
+
+    def __eq__(self, other):
+        return super().__eq__(other) and self.name == other.name
+
+    def __hash__(self):
+        return hash((self.order, self.parent, self.name))
+
+    def set_state(self):
+        if self.profiler.frame_start is not None:
+            self.start = time.perf_counter()
+
+    def unset_state(self):
+        if self.start is None:
+            return
+        # wait for the GPU, otherwise its time lands in whichever layer happens to block
+        glFinish()
+        self.profiler.sections.append((self.name, self.start, time.perf_counter() - self.start))
+        self.start = None
+
+
+class FrameProfiler:
+    """
+    enabled: whether frames are being timed
+    history: number of recent frames kept for percentiles and the trace
+    frame_times: duration of each recent frame, in seconds
+    sections: (name, start, duration) of each section of the current frame, in seconds
+    draw_calls: draw calls made by the current frame
+    allocations: number of each of ALLOCATED_KINDS created during the current frame
+    trace: trace events of the recent frames, see dump_trace
+    """
+    def __init__(self, enabled=False, history=240):
+        self.history = history
+        self.frame_times = deque(maxlen=history)
+        self.sections = []
+        self.draw_calls = 0
+        self.allocations = dict.fromkeys(ALLOCATED_KINDS, 0)
+        # each frame's trace events, so whole frames fall out of the window together
+        self.trace = deque(maxlen=history)
+        self.frame_start = None
+        self.enabled = enabled
+
+    def enable(self):
+        """Start timing frames and counting allocations"""
+        self.enabled = True
+
+    def disable(self):
+        """Stop timing frames, the history is kept"""
+        self.enabled = False
+        self.frame_start = None
+
+    def toggle(self):
+        """Enable the profiler if disabled, otherwise disable it"""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def allocated(self, kind):
+        """Count an object of one of ALLOCATED_KINDS being created, if during a timed frame"""
+        if self.frame_start is not None:
+            self.allocations[kind] += 1
+
+    def begin_frame(self):
+        """Start timing a frame"""
+        if not self.enabled:
+            return
+        self.sections = []
+        self.draw_calls = 0
+        self.allocations = dict.fromkeys(ALLOCATED_KINDS, 0)
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Finish timing the frame, waiting for the GPU so its time is included"""
+        if self.frame_start is None:
+            return
+        glFinish()
+        end = time.perf_counter()
+        self.frame_times.append(end - self.frame_start)
+
+        # complete events, with times in microseconds
+        events = [{"name": "frame", "ph": "X", "pid": os.getpid(), "tid": 0,
+                   "ts": self.frame_start * 1e6, "dur": (end - self.frame_start) * 1e6,
+                   "args": {"draw_calls": self.draw_calls, **self.allocations}}]
+        for name, start, duration in self.sections:
+            events.append({"name": name, "ph": "X", "pid": os.getpid(), "tid": 0,
+                           "ts": start * 1e6, "dur": duration * 1e6})
+        self.trace.append(events)
+        self.frame_start = None
+
+    def section(self, name):
+        """returns a context manager timing the code inside it as a section of the frame"""
+        if self.frame_start is None:
+            return nullcontext()
+        return self.timed(name)
+
+    @contextmanager
+    def timed(self, name):
+        """Time the code inside as a section of the frame"""
+        start = time.perf_counter()
+        yield
+        self.sections.append((name, start, time.perf_counter() - start))
+
+    def draw_batch(self, batch):
+        """Draw a batch, counting its draw calls. Its LayerGroups time themselves"""
+        if self.frame_start is not None:
+            self.draw_calls += count_draw_calls(batch)
+        batch.draw()
+
+    def summary(self) -> str:
+        """returns the text shown in the overlay: frame time percentiles,
+        draw calls and allocations, then the sections of the last frame"""
+        lines = [
+            f"frame p50 {percentile(self.frame_times, 0.5) * 1000:.2f} ms  "
+            f"p99 {percentile(self.frame_times, 0.99) * 1000:.2f} ms  "
+            f"({len(self.frame_times)} frames)",
+            f"draw calls {self.draw_calls}  " +
+            "  ".join(f"{name} {count}" for name, count in self.allocations.items()),
+        ]
+        # layers drawn as one section, like the player info panel, are added together
+        totals = {}
+        for name, _, duration in self.sections:
+            totals[name] = totals.get(name, 0) + duration
+        for name, duration in totals.items():
+            lines.append(f"{name:16} {duration * 1000:7.3f} ms")
+        return "\n".join(lines)
+
+    def dump_trace(self, path):
+        """Write the recent frames to path in the Chrome trace event format"""
+        events = [event for frame in self.trace for event in frame]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
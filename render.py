@@ -3,8 +3,6 @@ Window creation
 Texture loading, positioning and scaling
 """
 
-from threading import Thread
-
 import math
 import pyglet
 from pyglet.gl import (
@@ -14,25 +12,59 @@ from pyglet.gl import (
 
 
 from board import Board
-from board_config import TILE_ADJACENCY, Building
+from board_config import TILE_ADJACENCY
 from texture_enums import Resource, Color
-from button import Button
+from button import Button, HitGrid
+from structures import StructureLayer
+from layout import get_layout, center
+from profiler import FrameProfiler, LayerGroup
+import assets
+
+
+def set_text(label, text):
+    """Change the text of a label, only if it differs
+    (setting text lays out the label again even when it is the same)"""
+    if label.text != text:
+        label.text = text
+
+
+def place_sprite(sprite, area):
+    """Move a sprite to the bottom left corner of an area and scale it to the area's width"""
+    sprite.position = (area.x, area.y, sprite.z)
+    sprite.scale = area.width / sprite.image.width
+
+
+def aspect(image) -> float:
+    """returns the height to width ratio of an image, see Layout"""
+    return image.height / image.width
+
+
+def set_visible(sprite, visible):
+    """Show or hide a sprite, shape or label in a batch, only if that changes"""
+    if sprite.visible != visible:
+        sprite.visible = visible
 
 
 class Renderer():
     """
     Object used to load and draw the game on screen
     """
-    # TODO(eli) replace this crude scale factors with rectangles that define areas in the layout
-    # these will have a bottom-left corner, and width and height
-    # scale will be computed based on the bounds of these boxes
-
-    # ratio of tile width to screen width
-    TILE_SCALE = 0.075
-    # ratio of card width to screen width
-    CARD_SCALE = 0.06
-    # ratio of dice width to screen width
-    DICE_SCALE = 0.025
+    # positions and sizes come from the areas in layout.py
+
+    # ratio of the widest sprite to screen width, larger images are shrunk to about this when loaded
+    IMAGE_SCALE = 0.1
+    # images needed to show the board (tiles, gen nums and background), loaded before the first frame.
+    # the rest are loaded in the background, see load_pending
+    BOARD_IMAGES = list(range(0, 29)) + [53]
+    # the text and font size (at the design window size) of each button, by button_name
+    BUTTON_LABELS = {
+        "run_ai_turn": ("Ai Move", 65),
+        "roll_dice": ("Roll", 65),
+        "build_settlement": ("Settlement", 24),
+        "build_city": ("City", 48),
+        "build_road": ("Road", 48),
+        "end_turn": ("End Turn", 65),
+    }
 
     def __init__(self, window, board=None):
         self.window = window
@@ -46,207 +78,225 @@ class Renderer():
             self.board = board
 
 
+        self.profiler = FrameProfiler()
         self.load_images()
-        self.tiles_batch = pyglet.graphics.Batch()
-        self.gen_num_batch = pyglet.graphics.Batch()
+        # every persistent element of the scene lives in this one batch.
+        # groups are drawn in order, so each one is a layer of the scene,
+        # timed as a section of the frame by the profiler
+        self.batch = pyglet.graphics.Batch()
+        self.background_group = LayerGroup(self.profiler, "draw background", order=0)
+        self.tiles_group = LayerGroup(self.profiler, "draw tiles", order=1)
+        self.gen_num_group = LayerGroup(self.profiler, "draw gen nums", order=2)
+        self.cards_group = LayerGroup(self.profiler, "draw cards", order=3)
+        # the numbers on the cards, drawn after every card
+        self.card_label_group = pyglet.graphics.Group(order=6, parent=self.cards_group)
+        self.player_info_group = LayerGroup(self.profiler, "draw player info", order=4)
+        self.player_info_background_group = LayerGroup(self.profiler, "draw player info", order=5)
+        self.player_info_label_group = LayerGroup(self.profiler, "draw player info", order=6)
+        self.buttons_group = LayerGroup(self.profiler, "draw buttons", order=7)
+        self.button_label_group = LayerGroup(self.profiler, "draw buttons", order=8)
+        self.vertex_group = LayerGroup(self.profiler, "draw vertices", order=9)
+        self.dice_group = LayerGroup(self.profiler, "draw dice", order=10)
+        self.roads_group = LayerGroup(self.profiler, "draw roads", order=11)
+        self.buildings_group = LayerGroup(self.profiler, "draw buildings", order=12)
+        # text drawn over the scene while profiling, created when first shown
+        self.profile_overlay = None
+
+        self.layout = get_layout(self.window.width, self.window.height)
         self.load_tiles_batch()
-        self.load_card_sprites()
-        self.load_bank_sprites()
-        self.load_player_info(self.window.width*.85, self.window.height*.40)
-
         self.load_background()
 
-        self.load_building_sprites()
-
         self.buttons = []
         self.load_buttons()
 
+        # the rest of the scene is created as its images arrive
+        self.card_sprites = []
+        self.card_labels = []
+        self.bank_sprites = []
+        self.bank_labels = []
+        self.player_info_sprites = []
         self.dice_sprites = []
-        self.load_dice_sprites()
-
-        self.road_sprites = []
-        self.building_sprites = {index:None for index in range(54)}
+        # (images needed, function creating the sprites) for each part of the scene still loading
+        self.pending_loads = [
+            ([34, 45, 46], self.load_player_info),
+            (range(29, 34), self.load_bank_sprites),
+            (range(29, 45), self.load_card_sprites),
+            (range(47, 53), self.load_dice_sprites),
+        ]
+        self.asset_loader.start(range(len(self.image_names)))
+
+        # set for changes the revision counters don't cover, like a build button being toggled
+        self.dirty = True
+        # (board revision, game state revision) the screen was last drawn for
+        self.drawn_revision = None
+
+    def load_pending(self) -> bool:
+        """Create the sprites for any images that finished loading in the background.
+        returns True if there is something new to draw"""
+        if not self.pending_loads or not self.asset_loader.poll():
+            return False
+        pending = []
+        for indices, load in self.pending_loads:
+            if self.asset_loader.is_loaded(indices):
+                load()
+            else:
+                pending.append((indices, load))
+        self.pending_loads = pending
+        self.mark_dirty()
+        return True
+
+    def is_loaded(self) -> bool:
+        """True once every part of the scene has been created"""
+        return not self.pending_loads
+
+    def mark_dirty(self):
+        """Ask for the screen to be drawn again"""
+        self.dirty = True
+
+    def is_dirty(self) -> bool:
+        """True if the game changed since the screen was last drawn"""
+        revision = (self.board.revision, self.board.game_state.revision)
+        return self.dirty or revision != self.drawn_revision
 
 
     def update(self):
         """Function to update the screen"""
+        profiler = self.profiler
+        profiler.begin_frame()
+        with profiler.section("load images"):
+            self.load_pending()
+        self.dirty = False
+        self.drawn_revision = (self.board.revision, self.board.game_state.revision)
+
         # clear screen
         glClearColor(0.55, 0.45, 0.33, 1.0)
         glClear(GL_COLOR_BUFFER_BIT)
 
-        # draw background
-        self.background_sprite.draw()
-
         # enable blending
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        # draw tiles
-        self.tiles_batch.draw()
-        # draw gen nums
-        self.gen_num_batch.draw()
-        self.draw_player_cards(self.board.game_state.get_current_player().player_id)
-        # draw the bank
-        self.draw_bank_cards()
-
-        self.draw_player_info()
-        self.draw_buttons()
-        self.draw_dice()
-        self.draw_roads()
-        self.draw_buildings()
-
-
-    def draw_player_cards(self, player_id):
-        """Draw resource, development, and victory point cards in a player's hand""" 
+
+        # bring the sprites in the batch in line with the game state, then draw them all at once
+        player_id = self.board.game_state.get_current_player().player_id
+        with profiler.section("player cards"):
+            self.update_player_cards(player_id)
+        with profiler.section("bank"):
+            self.update_bank_cards()
+        with profiler.section("player info"):
+            self.update_player_info()
+        with profiler.section("vertex buttons"):
+            self.update_vertex_buttons()
+        with profiler.section("dice"):
+            self.update_dice()
+        with profiler.section("structures"):
+            self.structures.update(self.board)
+        profiler.draw_batch(self.batch)
+        profiler.end_frame()
+
+        if profiler.enabled:
+            self.draw_profile_overlay()
+
+    def toggle_profiler(self):
+        """Show or hide the profiling overlay, timing frames while it is shown"""
+        self.profiler.toggle()
+        self.mark_dirty()
+
+    def draw_profile_overlay(self):
+        """Draw the last frame's timings in the top left corner, outside the timed frame"""
+        if self.profile_overlay is None:
+            self.profile_overlay = pyglet.text.Label("",
+                font_name='Courier New',
+                color=(255, 255, 255),
+                multiline=True, width=1,
+                anchor_x='left', anchor_y='top')
+            self.place_profile_overlay()
+        set_text(self.profile_overlay, self.profiler.summary())
+        self.profile_overlay.draw()
+
+    def place_profile_overlay(self):
+        """Position the profiling overlay in the top left corner of the window"""
+        label = self.profile_overlay
+        label.font_size = 28 * self.layout.scale
+        label.width = self.layout.width / 2
+        padding = self.layout.height * 0.01
+        label.position = (padding, self.layout.height - padding, label.z)
+
+
+    def card_counts(self, player_id) -> list[int]:
+        """returns the number of each card in a player's hand, indexed by card value"""
         player = self.board.players[player_id]
         # integer quantity of each of the five resources in the resource list
         card_counts = [0 for _ in range(14)]
-        for resource in player.resources:
-            card_counts[resource.value] += 1
+        for value, count in enumerate(player.resources):
+            card_counts[value] = count
 
         for card in player.dev_cards:
             card_counts[card.value] += 1
-
-        for i in range(14):
-            if card_counts[i] > 0:
-                limit = min(card_counts[i], 5)
-                offset = self.card_sprites[i].width / 28
-                self.card_sprites[i].x += limit * offset
-                self.card_sprites[i].y += limit * offset
-                for _ in range(limit):
-                    self.card_sprites[i].x -= offset
-                    self.card_sprites[i].y -= offset
-                    self.card_sprites[i].draw()
-                #self.card_sprites[i].draw()
-                x = self.card_sprites[i].x
-                y = self.card_sprites[i].y
-                width = self.card_sprites[i].width
-                height = self.card_sprites[i].height
-                label = pyglet.text.Label(str(card_counts[i]),
-                          font_name='Times New Roman',
-                          font_size=40,
-                          x=x+(width*.75), y=y+(height*.85),
-                          anchor_x='center', anchor_y='center')
-                label.draw()
-
-    def draw_bank_cards(self) -> list[pyglet.text.Label]:
-        """Draw resource and development cards still in the bank"""
-        resource_bank = self.board.resource_bank
-        # integer quantity of each of the five resources in the resource list
-        resource_counts = [0 for _ in range(5)]
-        for resource in resource_bank.keys():
-            resource_counts[resource.value] = len(resource_bank[resource])
-
-        for i in range(5):
-            label = pyglet.text.Label()
-            self.bank_sprites[i].draw()
-            x = self.bank_sprites[i].x
-            y = self.bank_sprites[i].y
-            width = self.bank_sprites[i].width
-            height = self.bank_sprites[i].height
-            label = pyglet.text.Label(str(resource_counts[i]),
-                        font_name='Times New Roman',
-                        font_size=25,
-    #                  weight=5,
-                        x=x+(width*.75), y=y+(height*.85),
-                        anchor_x='center', anchor_y='center')
-            label.draw()
-
-
-    def draw_player_info(self):
-        """Draw each sprite in the player_info_sprites"""
+        return card_counts
+
+    def update_player_cards(self, player_id):
+        """Show as many cards of each type as the player holds, up to a stack of 5,
+        with the number of cards on top of the stack"""
+        card_counts = self.card_counts(player_id)
+        for sprites, label, count in zip(self.card_sprites, self.card_labels, card_counts):
+            limit = min(count, 5)
+            for depth, sprite in enumerate(sprites):
+                set_visible(sprite, depth < limit)
+            set_visible(label, count > 0)
+            set_text(label, str(count))
+
+    def update_bank_cards(self):
+        """Refresh the number of each resource still in the bank"""
+        # integer quantity of each of the five resources, indexed by Resource.value
+        resource_counts = self.board.resource_bank
+        for label, count in zip(self.bank_labels, resource_counts):
+            set_text(label, str(count))
+
+    def update_player_info(self):
+        """Refresh the numbers in the player info panel,
+        only if the board or game state changed since they were last written"""
+        if not self.player_info_sprites:
+            # still loading
+            return
+        revision = (self.board.revision, self.board.game_state.revision)
+        if revision == self.player_info_revision:
+            return
+        self.player_info_revision = revision
+
+        # move the marker next to the player whose turn it is
         player_to_move = self.board.game_state.get_current_player()
         base_sprite = self.player_info_sprites[player_to_move.player_id * 14]
-        radius = self.window.width *0.003
-        to_move_sprite = pyglet.shapes.Circle(radius=radius, color=Color.black.value,
-            x=base_sprite.x - radius * 2, y=base_sprite.y + base_sprite.height / 2)
-        to_move_sprite.draw()
-
-        for sprite in self.player_info_sprites:
-            for p_num, player in enumerate(self.board.players):
-                self.player_info_sprites[(p_num * 14) + 1].text = str(player.vps)
-                self.player_info_sprites[(p_num * 14) + 4].text = str(len(player.resources))
-                self.player_info_sprites[(p_num * 14) + 7].text = str(len(player.dev_cards))
-                self.player_info_sprites[(p_num * 14) + 10].text = str("-1")
-                longest_road = str(self.board.calculate_player_longest_road(player))
-                self.player_info_sprites[(p_num * 14) + 13].text = longest_road
-            sprite.draw()
-
-    def draw_buttons(self):
-        """draw each button on the screen"""
-        for button in self.buttons:
-            button.draw()
-        for button in self.board.get_clickable_vertices():
-            self.vertex_buttons[button].draw()
+        self.to_move_sprite.y = base_sprite.y + base_sprite.height / 2
 
-    def draw_dice(self):
-        """draw the current value of the dice roll on screen"""
+        for p_num, player in enumerate(self.board.players):
+            stats = (str(player.vps),
+                     str(player.resource_count()),
+                     str(len(player.dev_cards)),
+                     "-1",
+                     str(self.board.calculate_player_longest_road(player)))
+            if stats == self.player_info_stats[p_num]:
+                continue
+            self.player_info_stats[p_num] = stats
+            # labels are every third sprite after the player's color box and vp label
+            for offset, text in zip((1, 4, 7, 10, 13), stats):
+                set_text(self.player_info_sprites[(p_num * 14) + offset], text)
+
+    def update_vertex_buttons(self):
+        """Show the vertex buttons the current player can click on"""
+        clickable = set(self.board.get_clickable_vertices())
+        for vertex_index, button in enumerate(self.vertex_buttons):
+            set_visible(button.button_sprite, vertex_index in clickable)
+
+    def update_dice(self):
+        """show the current value of the dice roll"""
         roll = self.board.die_roll
         index_1 = (roll[0]-1)*2
         index_2 = (roll[1]-1)*2 + 1
-        self.dice_sprites[index_1].draw()
-        self.dice_sprites[index_2].draw()
-
-    def draw_roads(self):
-        """render the roads on the screen.
-           Also adds new road sprites if new roads have been placed"""
-        roads = self.board.roads
-        if len(roads) != len(self.road_sprites):
-            # if there is a new road to create...
-            new_roads = roads[len(self.road_sprites):]
-            for road in new_roads:
-                # for each road create and position a line between its two vertices
-                v1 = self.vertex_buttons[road.vertex1]
-                v2 = self.vertex_buttons[road.vertex2]
-                v1_x = v1.center[0]
-                v1_y = v1.center[1]
-                v2_x = v2.center[0]
-                v2_y = v2.center[1]
-                owner = road.owner
-                self.road_sprites.append(
-                    pyglet.shapes.Line(
-                        v1_x,
-                        v1_y,
-                        v2_x,
-                        v2_y,
-                        thickness=10.0,
-                        color=owner.color.value)
-                )
-
-        # render all roads in road_sprites
-        for road in self.road_sprites:
-            road.draw()
-
-    def draw_buildings(self):
-        """Draw cities and settlements on the board"""
-        for vertex_index, vertex in enumerate(self.board.vertices):
-            if self.building_sprites[vertex_index] is None:
-                added = False
-                vertex_button = self.vertex_buttons[vertex_index]
-                x_pos = vertex_button.center[0] - (vertex_button.radius) # center the building
-                y_pos = vertex_button.center[1] - vertex_button.radius
-                size = vertex_button.radius * 2
-                sprite = pyglet.shapes.Rectangle(x_pos, y_pos, size, size, color=(0,0,0))
-                if vertex.building is Building.SETTLEMENT:
-                    color = vertex.owner.color.value
-                    sprite = pyglet.shapes.Rectangle(x_pos, y_pos, size, size, color=color)
-                    added = True
-                elif vertex.building is Building.CITY:
-                    color = vertex.owner.color.value
-                    sprite = pyglet.shapes.Rectangle(x_pos, y_pos, size, size*1.5, color=color)
-                    added = True
-                # add the new building to the building_sprites dict
-                if added:
-                    self.building_sprites[vertex_index] = Button(
-                        False,
-                        vertex_button.center,
-                        sprite)
-
-        for vertex_index in self.building_sprites:
-            if self.building_sprites[vertex_index] is not None:
-                self.building_sprites[vertex_index].draw()
+        for index, sprite in enumerate(self.dice_sprites):
+            set_visible(sprite, index in (index_1, index_2))
 
     def load_images(self):
-        """Multithreaded image loading for all textures used in rendering"""
+        """Load the textures needed to show the board into a texture atlas, see assets.py"""
         self.image_names = [
             "assets/mountains1.png",
             "assets/mountains2.png",
@@ -303,352 +353,277 @@ class Renderer():
             "assets/dice6.png",
             "assets/woodgrain.png", # 53
         ]
-        image_count = len(self.image_names)
-        self.images = [None for _ in range(image_count)]
-        threads = [None for _ in range(image_count)]
-        for i in range(image_count):
-            threads[i] = Thread(target=self.load_image, args=(i,))
-            threads[i].start()
-
-        for thread in threads:
-            thread.join()
-
-
-    def load_image(self, image_index):
-        """This is a helper function only to be used by load_images"""
-        self.images[image_index] = pyglet.image.load(self.image_names[image_index])
+        max_width = math.ceil(self.IMAGE_SCALE * self.window.width)
+        self.asset_loader = assets.AssetLoader(self.image_names, max_width)
+        # filled in as images are loaded
+        self.images = self.asset_loader.images
+        self.asset_loader.load(self.BOARD_IMAGES)
+
+    def apply_layout(self, layout):
+        """Position and scale everything on screen for a new window size"""
+        self.layout = layout
+        self.place_background()
+        self.place_tiles()
+        self.place_buttons()
+        if self.card_sprites:
+            self.place_card_sprites()
+        if self.bank_sprites:
+            self.place_bank_sprites()
+        if self.player_info_sprites:
+            self.place_player_info()
+        if self.dice_sprites:
+            self.place_dice_sprites()
+        if self.profile_overlay is not None:
+            self.place_profile_overlay()
+        self.mark_dirty()
+
+    def on_resize(self, width, height):
+        """Lay the scene out again for the new window size"""
+        self.apply_layout(get_layout(width, height))
+
+    def new_sprite(self, image, group):
+        """returns a sprite of the image in the batch, counted by the profiler"""
+        self.profiler.allocated("sprites")
+        return pyglet.sprite.Sprite(image, batch=self.batch, group=group)
+
+    def new_label(self, text, group, **kwargs):
+        """returns a Times New Roman label in the batch, centered on its position,
+        counted by the profiler"""
+        self.profiler.allocated("labels")
+        return pyglet.text.Label(text, font_name='Times New Roman',
+                                 anchor_x='center', anchor_y='center',
+                                 batch=self.batch, group=group, **kwargs)
+
+    def new_shape(self, shape, *args, group, **kwargs):
+        """returns a shape of the given pyglet.shapes class in the batch, counted by the profiler"""
+        self.profiler.allocated("shapes")
+        return shape(*args, batch=self.batch, group=group, **kwargs)
 
     def load_card_sprites(self):
-        """Create and scale sprites corresponding to sprite images for each card image"""
+        """Create sprites corresponding to sprite images for each card image"""
         card_imgs = self.images[29:45]
 
-        # assume all card images are the same size
-        image_width = card_imgs[0].width
-        image_height = card_imgs[0].height
-
-        # hexagon tile dimensions
-        card_width = self.CARD_SCALE * self.window.width
-        card_height = (image_height / image_width) * card_width
-
-        # factor to scale tile images by
-        scale = card_width / image_width
-
+        # one list per card type, holding a stack of up to 5 sprites with the top card first
         self.card_sprites = []
-
-        # just a little spacing to make things look more normal
-        padding = card_width / 30
-        x_offset = 0
-        y_offset = 0
-        for i, image in enumerate(card_imgs):
-            if (i > 0 and i % 5 == 0):
-                x_offset = 0
-                y_offset += card_height + padding * 5
-
-            x = padding + x_offset
-            y = padding + y_offset
-            x_offset += card_width
-            sprite = pyglet.sprite.Sprite(image, x=x, y=y)
-            sprite.scale = scale
-            self.card_sprites.append(sprite)
+        # number of each card in the current player's hand, see update_player_cards
+        self.card_labels = []
+        # sprites deeper in the stack are drawn first
+        stack_groups = [pyglet.graphics.Group(order=5-depth, parent=self.cards_group)
+                        for depth in range(5)]
+
+        for image in card_imgs:
+            stack = []
+            for group in stack_groups:
+                sprite = self.new_sprite(image, group)
+                sprite.visible = False
+                stack.append(sprite)
+            self.card_sprites.append(stack)
+
+            label = self.new_label("0", self.card_label_group)
+            label.visible = False
+            self.card_labels.append(label)
+        self.place_card_sprites()
+
+    def place_card_sprites(self):
+        """Position and scale the cards in the hand, five to a row"""
+        # assume all card images are the same size
+        placements = self.layout.cards(len(self.card_sprites), aspect(self.card_sprites[0][0].image))
+        font_size = 40 * self.layout.scale
+        for stack, label, (areas, label_center) in zip(self.card_sprites, self.card_labels,
+                                                      placements):
+            for sprite, area in zip(stack, areas):
+                place_sprite(sprite, area)
+            label.font_size = font_size
+            label.position = (*label_center, label.z)
 
     def load_bank_sprites(self):
-        """Create and scale sprites corresponding to sprite images for each card image"""
+        """Create sprites and count labels for each resource in the bank"""
         resource_imgs = self.images[29:34]
 
-        # assume all card images are the same size
-        image_width = resource_imgs[0].width
-        #image_height = resource_imgs[0].height
-
-        # These will be about half as small as the regular resource cards
-        card_width = self.CARD_SCALE * self.window.width / 2
-        #card_height = (image_height / image_width) * card_width
-
-        # factor to scale tile images by
-        scale = card_width / image_width
-
         self.bank_sprites = []
-
-        # just a little spacing to make things look more normal
-        padding = card_width / 30
-
-        # from 5 --> 1
+        self.bank_labels = []
         for i in range(5):
-            x = self.window.width - (padding + card_width * (5-i))
-            y = padding + self.window.height / 2
-            sprite = pyglet.sprite.Sprite(resource_imgs[i], x=x, y=y)
-            sprite.scale = scale
+            sprite = self.new_sprite(resource_imgs[i], self.cards_group)
             self.bank_sprites.append(sprite)
-
+            label = self.new_label(str(self.board.resource_bank[i]), self.card_label_group)
+            self.bank_labels.append(label)
+        self.place_bank_sprites()
+
+    def place_bank_sprites(self):
+        """Position and scale the bank's cards in a row"""
+        placements = self.layout.bank_cards(aspect(self.bank_sprites[0].image))
+        font_size = 25 * self.layout.scale
+        for sprite, label, (area, label_center) in zip(self.bank_sprites, self.bank_labels,
+                                                      placements):
+            place_sprite(sprite, area)
+            label.font_size = font_size
+            label.position = (*label_center, label.z)
 
     def load_dice_sprites(self):
         """Load dice images"""
         dice_imgs = self.images[47:53]
 
-        image_width = dice_imgs[0].width
-
-        roll_button = self.buttons[1]
-
-        dice_width = min(roll_button.width / 2, roll_button.height) * 0.8
-
-        scale = dice_width / image_width
-
-        x_pad = (roll_button.width - (dice_width * 2)) / 3
-        y_pad = (roll_button.height - dice_width) / 2
-
-        x_1 = roll_button.top_left[0] + x_pad
-        y_1 = roll_button.bottom_right[1] + y_pad + roll_button.height
-
-        x_2 = roll_button.top_left[0] + (roll_button.width + x_pad) / 2
-        y_2 = roll_button.bottom_right[1] + y_pad + roll_button.height
-
         self.dice_sprites = []
         for i in range(6):
-            sprite = pyglet.sprite.Sprite(dice_imgs[i], x=x_1, y=y_1)
-            sprite.scale = scale
+            sprite = self.new_sprite(dice_imgs[i], self.dice_group)
+            sprite.visible = False
             self.dice_sprites.append(sprite)
 
             # same sprite but positioned to the right.
-            sprite_2 = pyglet.sprite.Sprite(dice_imgs[i], x=x_2, y=y_2)
-            sprite_2.scale = scale
+            sprite_2 = self.new_sprite(dice_imgs[i], self.dice_group)
+            sprite_2.visible = False
             self.dice_sprites.append(sprite_2)
+        self.place_dice_sprites()
 
+    def place_dice_sprites(self):
+        """Position and scale the dice side by side in their area"""
+        for index, sprite in enumerate(self.dice_sprites):
+            # even sprites are the left die
+            place_sprite(sprite, self.layout.left_die if index % 2 == 0 else self.layout.right_die)
 
-    def load_player_info(self, x, y):
-        """Load/position images used to display every player's data on the side of the screen.
-           x, y are the top-left coordinates where the data should be displayed on screen."""
+    def load_player_info(self):
+        """Load images used to display every player's data on the side of the screen"""
         knight_img = self.images[34]
         resource_card_back_img = self.images[45]
         dev_card_back_img = self.images[46]
-        card_width = (self.CARD_SCALE * self.window.width / 2) / 2 # looks more natural
-        image_width = knight_img.width
-        scale = card_width / image_width
-        padding = card_width / 30
-
-        y_offset = (self.window.height * self.CARD_SCALE * 1.5) + padding
 
         self.player_info_sprites = []
+        # (board revision, game state revision) the panel labels were last written for
+        self.player_info_revision = None
+        # the text currently shown for each player, see update_player_info
+        self.player_info_stats = [None for _ in self.board.players]
 
-        for p_num, player in enumerate(self.board.players):
+        for player in self.board.players:
             # display player color, VPs, #cards, #dev cards, #knights played, longest road
-            y_pos = y - ((p_num)*y_offset)
-            player_sprite = pyglet.shapes.Rectangle(
-                x,
-                y_pos + card_width,
-                card_width,
-                card_width,
-                color=player.color.value)
+            player_sprite = self.new_shape(pyglet.shapes.Rectangle, 0, 0, 0, 0,
+                color=player.color.value, group=self.player_info_group)
             self.player_info_sprites.append(player_sprite)
 
             # display vp total inside the player's color box
-            vp_label = pyglet.text.Label(str(player.vps),
-                    font_name='Times New Roman',
-                    font_size=25,
-                    x=player_sprite.x + (player_sprite.width / 2),
-                    y=player_sprite.y + (player_sprite.height / 2),
-                    anchor_x='center', anchor_y='center')
+            vp_label = self.new_label(str(player.vps), self.player_info_label_group)
             self.player_info_sprites.append(vp_label)
 
-            # position the graphic that shows the card icon
-            x_pos = x + card_width + padding*3 # add extra padding
-            card_sprite = pyglet.sprite.Sprite(resource_card_back_img, x=x_pos, y=y_pos)
-            card_sprite.scale = scale*2
-            self.player_info_sprites.append(card_sprite)
-            label_background, label = self.label_from_sprite(
-                card_sprite,
-                str(len(player.resources)))
-
-            self.player_info_sprites.append(label_background)
-            self.player_info_sprites.append(label)
-
-            # position the graphic that shows the dev card count
-            x_pos = x + (card_width*3) + padding*6
-            dev_card_sprite = pyglet.sprite.Sprite(dev_card_back_img, x=x_pos, y=y_pos)
-            dev_card_sprite.scale = scale*2
-            self.player_info_sprites.append(dev_card_sprite)
-
-            label_background, label = self.label_from_sprite(
-                dev_card_sprite,
-                str(len(player.dev_cards)))
-
-            self.player_info_sprites.append(label_background)
-            self.player_info_sprites.append(label)
-
-            # position the graphic that shows the knight count
-            x_pos = x + (card_width*5) + padding*9
-
-            knight_sprite = pyglet.sprite.Sprite(knight_img, x=x_pos, y=y_pos)
-            knight_sprite.scale = scale*2
-            self.player_info_sprites.append(knight_sprite)
-
-            label_background, label = self.label_from_sprite(
-                knight_sprite,
-                str(len(player.dev_cards)))
-
-            self.player_info_sprites.append(label_background)
-            self.player_info_sprites.append(label)
-
-            # position the graphic that shows the longest road count
-            x_pos = x + (card_width*7) + padding*12
-
-            road_sprite = pyglet.sprite.Sprite(knight_img, x=x_pos, y=y_pos)
-            road_sprite.scale = scale*2
-            self.player_info_sprites.append(road_sprite)
-
-            label_background, label = self.label_from_sprite(
-                road_sprite,
-                str(len(player.dev_cards)))
-
-            self.player_info_sprites.append(label_background)
-            self.player_info_sprites.append(label)
-
-    def load_building_sprites(self):
-        """Load building sprites"""
-        self.building_sprites = []
-
-    def label_from_sprite(self, sprite, text):
-        """returns a background box and label in the upper right corner of the given sprite"""
-        width = sprite.width
-        height = sprite.height
-        x_pos = sprite.x
-        y_pos = sprite.y
-        label = pyglet.text.Label(text,
-                font_name='Times New Roman',
-                font_size=25,
-                color=(255,255,255),
-                x=x_pos+(width*.75), y=y_pos+(height*.85),
-                anchor_x='center', anchor_y='center')
-        l_x = x_pos+(width*.5)
-        l_y = y_pos+(height*.7)
-        l_w = width * .5
-        l_h = height * .3
-        label_background = pyglet.shapes.Rectangle(l_x, l_y, l_w, l_h, color=(0, 0, 0))
-
-        return label_background, label
+            # the card icon, dev card, knight and longest road graphics, each with a count
+            for image in (resource_card_back_img, dev_card_back_img, knight_img, knight_img):
+                sprite = self.new_sprite(image, self.player_info_group)
+                self.player_info_sprites.append(sprite)
+                label_background = self.new_shape(pyglet.shapes.Rectangle, 0, 0, 0, 0,
+                    color=(0, 0, 0), group=self.player_info_background_group)
+                self.player_info_sprites.append(label_background)
+                label = self.new_label("", self.player_info_label_group, color=(255,255,255))
+                self.player_info_sprites.append(label)
+
+        # marks the player whose turn it is, moved by update_player_info
+        self.to_move_sprite = self.new_shape(pyglet.shapes.Circle, 0, 0, 0,
+            color=Color.black.value, group=self.player_info_group)
+        self.place_player_info()
+
+    def place_player_info(self):
+        """Position and scale every player's row of the player info panel"""
+        # the card icon, dev card, knight and longest road graphics of the first row
+        graphics = self.player_info_sprites[2:14:3]
+        rows = self.layout.player_rows(len(self.board.players),
+                                       tuple(aspect(sprite.image) for sprite in graphics))
+        font_size = 25 * self.layout.scale
+
+        for p_num, (box, placements) in enumerate(rows):
+            sprites = self.player_info_sprites[p_num * 14:(p_num + 1) * 14]
+            player_sprite = sprites[0]
+            player_sprite.position = (box.x, box.y)
+            player_sprite.width = box.width
+            player_sprite.height = box.height
+
+            vp_label = sprites[1]
+            vp_label.font_size = font_size
+            vp_label.position = (*center(box), vp_label.z)
+
+            for graphic, (area, label_center, background) in enumerate(placements):
+                sprite, label_background, label = sprites[2 + graphic * 3:5 + graphic * 3]
+                place_sprite(sprite, area)
+                label_background.position = (background.x, background.y)
+                label_background.width = background.width
+                label_background.height = background.height
+                label.position = (*label_center, label.z)
+                label.font_size = font_size
+
+        radius = 9 * self.layout.scale
+        self.to_move_sprite.radius = radius
+        self.to_move_sprite.x = self.layout.player_info.x - radius * 2
+        # the marker's height follows the player to move
+        self.player_info_revision = None
 
     def load_buttons(self):
         """Load button objects"""
-        pad = self.window.height * 0.005
-
-        width = self.window.width * 0.15 - pad
-        height = self.window.height * 0.120 - pad
-        x = self.window.width - width / 2 - pad
-        y = height / 2 + pad
-        label = pyglet.text.Label("End Turn", font_size = 65,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        end_turn_button = Button(
-            False,
-            center=(x, y),
-            width=width,
-            height=height,
-            button_name="end_turn",
-            button_label=label)
-
-        y = self.window.height * 0.67
-        label = pyglet.text.Label("Roll", font_size = 65,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        roll_button = Button(
-            False,
-            center=(x,y),
-            width=width,
-            height=height,
-            button_name="roll_dice",
-            button_label=label)
-
-        x -= width + pad * 2
-        y = height / 2 + pad
-        label = pyglet.text.Label("Ai Move", font_size = 65,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        ai_button = Button(
-            False,
-            center=(x,y),
-            width=width,
-            height=height,
-            button_name="run_ai_turn",
-            button_label=label)
-
-        width = self.window.height * 0.1
-        height = self.window.height * 0.1
-        x = self.window.width / 2 - self.tile_sprites[0].width
-        y = self.window.height * 0.08
-        label = pyglet.text.Label("Settlement", font_size = 24,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        build_settlement_button = Button(
-            False,
-            center=(x, y),
-            width=width,
-            height=height,
-            button_name="build_settlement",
-            button_label=label)
-
-        x = self.window.width / 2
-
-        label = pyglet.text.Label("City", font_size = 48,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        build_city_button = Button(
-            False,
-            center=(x, y),
-            width=width,
-            height=height,
-            button_name="build_city",
-            button_label=label)
-
-        x += self.tile_sprites[0].width
-        label = pyglet.text.Label("Road", font_size = 48,
-            font_name="Times New Roman",
-            x=x, y=y, anchor_x='center', anchor_y='center')
-        build_road_button = Button(
-            False,
-            center=(x, y),
-            width=width,
-            height=height,
-            button_name="build_road",
-            button_label=label)
-        
-
-
-        self.buttons.append(ai_button)
-        self.buttons.append(roll_button)
-        self.buttons.append(build_settlement_button)
-        self.buttons.append(build_city_button)
-        self.buttons.append(build_road_button)
-        self.buttons.append(end_turn_button)
-
-        #width = self.window.width
-        #height = window.height * 0.1
-        #end_turn_button = Button(False, (x, y), width=width, height=height, button_name="end_turn")
+        for name, (text, font_size) in self.BUTTON_LABELS.items():
+            label = self.new_label(text, self.button_label_group)
+            sprite = self.new_shape(pyglet.shapes.Rectangle, 0, 0, 0, 0,
+                color=Color.red.value, group=self.buttons_group)
+            self.buttons.append(Button(
+                False,
+                button_name=name,
+                button_sprite=sprite,
+                button_label=label))
 
         self.vertex_buttons = [None for _ in range(54)]
 
-        # initialize vertex buttons:
-        for index, tile_sprite in enumerate(self.tile_sprites):
-            tile_width = tile_sprite.width * 1.05 # positions the vertices in a more suitable manner
-            tile_height = tile_sprite.height
-
-            x_center = tile_sprite.x + (tile_width/2)
-            y_center = tile_sprite.y + (tile_height/2)
-
+        # initialize vertex buttons, colored by their position around the first tile they touch
+        for index in range(len(self.tile_sprites)):
             for i in range(6):
-                x_pos = x_center + (tile_width/2) * math.cos((i * math.pi / 3) - math.pi/2)
-                y_pos = y_center + (tile_height/2) * math.sin((i * math.pi / 3) - math.pi/2)
-
                 vertex_index = TILE_ADJACENCY[index][i]
                 if self.vertex_buttons[vertex_index] is None:
-                    sprite = pyglet.shapes.Circle(x_pos,y_pos, 20, color=(0,0,int(255/(i+1))))
+                    sprite = self.new_shape(pyglet.shapes.Circle, 0, 0, 0,
+                        color=(0,0,int(255/(i+1))), group=self.vertex_group)
+                    sprite.visible = False
                     self.vertex_buttons[vertex_index] = Button(
                         True,
-                        (x_pos, y_pos),
-                        radius=20,
                         button_name="vertex",
                         button_sprite=sprite)
 
+        # roads and buildings are drawn at the vertex buttons
+        self.structures = StructureLayer(
+            self.vertex_centers(),
+            size=0,
+            road_thickness=0,
+            batch=self.batch,
+            roads_group=self.roads_group,
+            buildings_group=self.buildings_group)
+        self.place_buttons()
+
+    def place_buttons(self):
+        """Position the buttons in their areas and the vertex buttons around the tiles"""
+        scale = self.layout.scale
+        for button in self.buttons:
+            area = self.layout.buttons[button.button_name]
+            button.move(center(area), width=area.width, height=area.height)
+            button.button_label.font_size = self.BUTTON_LABELS[button.button_name][1] * scale
+
+        radius = 20 * scale
+        centers = self.vertex_centers()
+        for button, vertex_center in zip(self.vertex_buttons, centers):
+            button.move(vertex_center, radius=radius)
+        self.structures.move(centers, size=radius * 2, road_thickness=10 * scale)
+
+        # index the buttons by position so a click only tests the buttons near it
+        cell_size = self.layout.height * 0.05
+        self.button_grid = HitGrid(cell_size)
+        for button in self.buttons:
+            self.button_grid.add(button, button)
+        self.vertex_grid = HitGrid(cell_size)
+        for vertex_index, button in enumerate(self.vertex_buttons):
+            self.vertex_grid.add(vertex_index, button)
+
+    def vertex_centers(self) -> list[tuple[float, float]]:
+        """returns the screen position of every vertex, around the tiles"""
+        return self.layout.vertex_centers(*self.tile_shape())
+
+    def tile_shape(self) -> tuple[tuple, float]:
+        """returns the axial coordinates of the tiles and the aspect of their images,
+        which Layout.tiles places them by"""
+        # assume all tile images are the same size
+        return tuple(tile.coords for tile in self.board.tiles), aspect(self.tile_sprites[0].image)
 
     def load_tiles_batch(self):
-        """Create, position, and scale sprites for tiles and gen nums"""
+        """Create sprites for tiles and gen nums"""
         mountains_imgs = self.images[0:3]
         fields_imgs = self.images[3:7]
         pasture_imgs = self.images[7:11]
@@ -663,38 +638,10 @@ class Renderer():
         hills_index = 0
         forest_index = 0
 
-        # assume all tile images are the same size
-        tile_image_width = desert_img.width
-        tile_image_height = desert_img.height
-
-        # hexagon tile dimensions
-        tile_width = self.TILE_SCALE * self.window.width
-        tile_height = (tile_image_height / tile_image_width) * tile_width
-
-        # factor to scale tile images by
-        tile_scale = tile_width / tile_image_width
-
-        gen_num_image_width = gen_num_imgs[0].width
-
-        # gen nums are sized relative to the tiles that contain them
-        gen_num_width = tile_width / 3
-        gen_num_height = tile_height / 3
-
-        # scale factor to adjust image by
-        gen_num_scale = gen_num_width / gen_num_image_width
-
-        # used to position gen num relevent to corresponding tile
-        gen_num_x_offset = (tile_width - gen_num_width) / 2
-        gen_num_y_offset = (tile_height - gen_num_height) / 2
-
-        # store tile and gen num sprites
+        # store tile and gen num sprites, gen nums are indexed by tile (None for the desert)
         self.tile_sprites = []
         self.gen_num_sprites = []
 
-        # coordinates of where to position central tile
-        center_x = self.window.width / 2 - tile_width / 2
-        center_y = self.window.height / 2 - tile_height / 2
-
         for tile in self.board.tiles:
             match tile.resource:
                 case Resource.ore:
@@ -715,46 +662,35 @@ class Renderer():
                 case _: # none
                     tile_image = desert_img
 
-            # axial coordinates specify a signed integer x, y offset from a (0, 0) center
-            axial_x, axial_y = tile.coords
-
-            # Tiles above the midline need to be shifted right, likewise below shifted left.
-            # the axial_y / 2 term accounts for this shift. The reason for dividing by two is that
-            # the hexagon grid is staggered row to row for tesselation.
-            x = center_x + tile_width * (axial_x + axial_y / 2)
-
-            # If you picture the largest rectangle you could draw within a hexagon,
-            # the height of that rectangle is 1/2 the height of the whole shape
-            # the pointed section above this rectangle fits into the above row of hexagons.
-            # the height of this upper section is 1/4 of the shape's height, meaning
-            # the row coordinate must be scaled by 3/4
-            y = center_y + tile_height * (axial_y * 0.75)
-
-            tile_sprite = pyglet.sprite.Sprite(tile_image, batch=self.tiles_batch, x=x, y=y)
-            tile_sprite.scale = tile_scale
+            tile_sprite = self.new_sprite(tile_image, self.tiles_group)
             self.tile_sprites.append(tile_sprite)
 
-            x += gen_num_x_offset
-            y += gen_num_y_offset
             gen_num_image = None
             if tile.gen_num >= 2 and tile.gen_num <= 6:
                 gen_num_image = gen_num_imgs[tile.gen_num - 2]
             elif tile.gen_num >= 8 and tile.gen_num <= 12:
                 gen_num_image = gen_num_imgs[tile.gen_num - 3]
+            gen_num_sprite = None
             if gen_num_image:
-                gen_num_sprite = pyglet.sprite.Sprite(gen_num_image,
-                    batch=self.gen_num_batch, x=x, y=y)
-                gen_num_sprite.scale = gen_num_scale
-                self.gen_num_sprites.append(gen_num_sprite)
-
+                gen_num_sprite = self.new_sprite(gen_num_image, self.gen_num_group)
+            self.gen_num_sprites.append(gen_num_sprite)
+        self.place_tiles()
+
+    def place_tiles(self):
+        """Position and scale the tiles and gen nums in the board area"""
+        placements = self.layout.tiles(*self.tile_shape())
+        for tile_sprite, gen_num_sprite, (tile_area, gen_num_area) in zip(
+                self.tile_sprites, self.gen_num_sprites, placements):
+            place_sprite(tile_sprite, tile_area)
+            if gen_num_sprite:
+                place_sprite(gen_num_sprite, gen_num_area)
 
     def load_background(self):
         """Load the background image"""
         background_img = self.images[53]
-        self.background_sprite = pyglet.sprite.Sprite(background_img, x=0, y=0)
-        self.background_sprite.scale = self.window.height / background_img.height
+        self.background_sprite = self.new_sprite(background_img, self.background_group)
+        self.place_background()
 
-    def get_clickables(self):
-        """return list of clickable elements on the board"""
-        clickables = self.buttons
-        return clickables
+    def place_background(self):
+        """Scale the background to the height of the window"""
+        self.background_sprite.scale = self.layout.height / self.background_sprite.image.height
@@ -1,11 +1,17 @@
 """Class representing a road as two vertices and an owner"""
+from board_config import EDGE_INDEX
+
 class Road:
     """
     owner: Player that placed the road
     vertex1: vertex on one end of road
     vertex2: vertex on other end of road
+    edge: id of the edge the road is on (see board_config.EDGES)
     """
+    __slots__ = ("owner", "vertex1", "vertex2", "edge")
+
     def __init__(self, owner, vertex1, vertex2):
         self.owner = owner
         self.vertex1 = vertex1
         self.vertex2 = vertex2
+        self.edge = EDGE_INDEX[(vertex1, vertex2)]
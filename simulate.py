@@ -0,0 +1,107 @@
+"""
+Headless batch simulation of AI-vs-AI games.
+Plays full games through Board and GameState without opening a window,
+so nothing on this path imports pyglet.
+
+usage: python simulate.py --games 1000 --seed 0
+"""
+import argparse
+import time
+from collections import namedtuple
+
+from ai import make_policy
+from board import Board
+
+# Compact summary of a finished game
+# winner: player_id of the winner, or None if the game hit the turn limit
+# turns: number of main phase turns played
+# vps: final victory points of every player, ordered by player_id
+# resources_drawn: resource cards each player drew from the bank, ordered by player_id
+GameResult = namedtuple("GameResult", ["seed", "winner", "turns", "vps", "resources_drawn"])
+
+# Games that go this long are stopped and reported without a winner
+MAX_TURNS = 2000
+
+
+# Policy played by every seat unless told otherwise
+DEFAULT_POLICIES = ("random", "random", "random", "random")
+
+
+def play_game(seed=None, max_turns=MAX_TURNS, policies=DEFAULT_POLICIES) -> GameResult:
+    """Play a single game between AI players until someone wins or max_turns is reached.
+    policies holds the name of the policy playing each seat, ordered by player_id"""
+    board = Board(seed=seed)
+    state = board.game_state
+    seats = [make_policy(name) for name in policies]
+
+    # every seat (including the user's) is played by the AI during simulation
+    while state.is_start_phase():
+        player = state.get_current_player()
+        seats[player.player_id].start_turn(board, player)
+
+    turns = 0
+    winner = board.get_winner()
+    while winner is None and turns < max_turns:
+        player = state.get_current_player()
+        seats[player.player_id].turn(board, player)
+        turns += 1
+        winner = board.get_winner()
+
+    return GameResult(
+        seed=seed,
+        winner=None if winner is None else winner.player_id,
+        turns=turns,
+        vps=tuple(player.vps for player in board.players),
+        resources_drawn=tuple(player.resources_drawn for player in board.players))
+
+
+def run_games(games, seed=0, max_turns=MAX_TURNS, policies=DEFAULT_POLICIES) -> list[GameResult]:
+    """Play the given number of games. Game i is seeded with seed + i,
+    so a batch is reproducible from its base seed."""
+    return [play_game(seed + i, max_turns, policies) for i in range(games)]
+
+
+def summarize(results, elapsed):
+    """Returns a short printable report for a batch of results"""
+    wins = {}
+    unfinished = 0
+    for result in results:
+        if result.winner is None:
+            unfinished += 1
+        else:
+            wins[result.winner] = wins.get(result.winner, 0) + 1
+    average_turns = sum(result.turns for result in results) / max(len(results), 1)
+    average_drawn = sum(sum(result.resources_drawn) for result in results) / \
+        max(sum(len(result.resources_drawn) for result in results), 1)
+    lines = [
+        f"games:         {len(results)}",
+        f"elapsed:       {elapsed:.3f}s",
+        f"games/second:  {len(results) / elapsed if elapsed > 0 else float('inf'):.1f}",
+        f"average turns: {average_turns:.1f}",
+        f"unfinished:    {unfinished}",
+        f"average resources drawn per player: {average_drawn:.1f}",
+    ]
+    for player_id in sorted(wins):
+        lines.append(f"player {player_id} wins: {wins[player_id]}")
+    return "\n".join(lines)
+
+
+def main():
+    """Parse command line arguments and run a batch of games"""
+    parser = argparse.ArgumentParser(description="Run headless AI-vs-AI Catan games")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+                        help="stop a game without a winner after this many turns")
+    parser.add_argument("--policies", default=",".join(DEFAULT_POLICIES),
+                        help="comma separated policy name for each seat")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_games(args.games, args.seed, args.max_turns, tuple(args.policies.split(",")))
+    elapsed = time.perf_counter() - start
+    print(summarize(results, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Roads and buildings drawn from two preallocated vertex lists:
+one quad for each of the 72 edges and one for each of the 54 vertices.
+Placing, upgrading or removing a piece only rewrites that slot of the lists,
+so the whole layer is two draw calls however many pieces are on the board.
+"""
+import math
+
+import pyglet
+from pyglet.gl import GL_TRIANGLES
+
+from board_config import EDGES, Building
+
+vertex_source = """#version 150 core
+    in vec2 position;
+    in vec4 colors;
+
+    out vec4 vertex_colors;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        gl_Position = window.projection * window.view * vec4(position, 0.0, 1.0);
+        vertex_colors = colors;
+    }
+"""
+
+fragment_source = """#version 150 core
+    in vec4 vertex_colors;
+    out vec4 final_color;
+
+    void main()
+    {
+        // empty slots are fully transparent
+        if (vertex_colors.a < 0.01) {
+            discard;
+        }
+        final_color = vertex_colors;
+    }
+"""
+
+# corners of the two triangles making up a quad, as fractions of its width and height
+QUAD_CORNERS = ((0, 0), (1, 0), (1, 1), (0, 0), (1, 1), (0, 1))
+# color of an empty slot, which the fragment shader discards
+HIDDEN = (0, 0, 0, 0)
+
+
+def slot_colors(owner) -> tuple:
+    """returns the colors of the 6 vertices of a slot owned by owner (None for an empty slot)"""
+    if owner is None:
+        return HIDDEN * 6
+    return (*owner.color.value, 255) * 6
+
+
+def rectangle_positions(x, y, width, height) -> list[float]:
+    """returns the positions of the 6 vertices of an axis aligned rectangle"""
+    positions = []
+    for corner_x, corner_y in QUAD_CORNERS:
+        positions += [x + corner_x * width, y + corner_y * height]
+    return positions
+
+
+def line_positions(start, end, thickness) -> list[float]:
+    """returns the positions of the 6 vertices of a thick line from start to end"""
+    length = math.dist(start, end)
+    # half the thickness, at a right angle to the line
+    normal_x = (start[1] - end[1]) / length * thickness / 2
+    normal_y = (end[0] - start[0]) / length * thickness / 2
+    corners = ((start[0] - normal_x, start[1] - normal_y),
+               (end[0] - normal_x, end[1] - normal_y),
+               (end[0] + normal_x, end[1] + normal_y),
+               (start[0] + normal_x, start[1] + normal_y))
+    positions = []
+    for index in (0, 1, 2, 0, 2, 3):
+        positions += corners[index]
+    return positions
+
+
+class StructureLayer:
+    """
+    centers: screen position of every vertex, indexed by vertex index
+    size: width of a settlement, cities are half again as tall
+    roads: vertex list with a quad for every edge, indexed by edge id
+    buildings: vertex list with a quad for every vertex, indexed by vertex index
+    road_owners: the owner drawn on each edge, None for an empty edge
+    building_keys: the (building, owner) drawn on each vertex
+    """
+    def __init__(self, centers, size, road_thickness, batch, roads_group, buildings_group):
+        program = pyglet.gl.current_context.create_program((vertex_source, 'vertex'),
+                                                           (fragment_source, 'fragment'))
+        self.roads = program.vertex_list(
+            len(EDGES) * 6, GL_TRIANGLES,
+            batch=batch, group=pyglet.graphics.ShaderGroup(program, parent=roads_group),
+            position=('f', [0.0] * len(EDGES) * 12),
+            colors=('Bn', HIDDEN * len(EDGES) * 6))
+        self.road_owners = [None] * len(EDGES)
+
+        self.buildings = program.vertex_list(
+            len(centers) * 6, GL_TRIANGLES,
+            batch=batch, group=pyglet.graphics.ShaderGroup(program, parent=buildings_group),
+            position=('f', [0.0] * len(centers) * 12),
+            colors=('Bn', HIDDEN * len(centers) * 6))
+        self.move(centers, size, road_thickness)
+
+    def move(self, centers, size, road_thickness):
+        """Position the slots at new vertex centers, when the window is resized"""
+        self.centers = centers
+        self.size = size
+        # roads only move with the window, so every edge's quad is positioned up front
+        road_positions = []
+        for vertex1, vertex2 in EDGES:
+            road_positions += line_positions(centers[vertex1], centers[vertex2], road_thickness)
+        self.roads.position[:] = road_positions
+        # buildings are positioned when they are drawn, forget what is drawn so they all are
+        self.building_keys = [(None, None)] * len(centers)
+
+    def update(self, board):
+        """Rewrite the slots whose road or building changed since the last update"""
+        for edge, owner in enumerate(board.edge_owners):
+            if owner is not self.road_owners[edge]:
+                self.road_owners[edge] = owner
+                self.roads.colors[edge * 24:(edge + 1) * 24] = slot_colors(owner)
+
+        for vertex_index, vertex in enumerate(board.vertices):
+            key = (vertex.building, vertex.owner)
+            if key == self.building_keys[vertex_index]:
+                continue
+            self.building_keys[vertex_index] = key
+            # center the building on the vertex
+            x = self.centers[vertex_index][0] - self.size / 2
+            y = self.centers[vertex_index][1] - self.size / 2
+            height = self.size * 1.5 if vertex.building is Building.CITY else self.size
+            self.buildings.position[vertex_index * 12:(vertex_index + 1) * 12] = \
+                rectangle_positions(x, y, self.size, height)
+            owner = vertex.owner if vertex.building is not Building.NONE else None
+            self.buildings.colors[vertex_index * 24:(vertex_index + 1) * 24] = slot_colors(owner)
@@ -0,0 +1,55 @@
+"""The positions in a Layout are worked out once per window size and fit in the window"""
+import pytest
+
+from board import Board
+from layout import get_layout
+
+SIZES = [(3000, 1500), (1920, 1080), (1280, 720), (1000, 1000)]
+
+# height to width ratio of the tile and card images
+TILE_ASPECT = 1.15
+CARD_ASPECT = 1.5
+
+
+def tile_coords():
+    return tuple(tile.coords for tile in Board().tiles)
+
+
+def inside(rect, width, height):
+    return (0 <= rect.x and rect.x + rect.width <= width
+            and 0 <= rect.y and rect.y + rect.height <= height)
+
+
+def test_positions_are_cached_per_window_size():
+    layout = get_layout(1920, 1080)
+    assert get_layout(1920, 1080) is layout
+    coords = tile_coords()
+    assert layout.tiles(coords, TILE_ASPECT) is layout.tiles(coords, TILE_ASPECT)
+    assert layout.cards(16, CARD_ASPECT) is layout.cards(16, CARD_ASPECT)
+    assert get_layout(1280, 720).tiles(coords, TILE_ASPECT) != layout.tiles(coords, TILE_ASPECT)
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+def test_tiles_are_on_the_board(width, height):
+    layout = get_layout(width, height)
+    board = layout.board
+    for tile, gen_num in layout.tiles(tile_coords(), TILE_ASPECT):
+        assert inside(tile, width, height)
+        assert board.x <= tile.x and tile.x + tile.width <= board.x + board.width
+        assert tile.x < gen_num.x and gen_num.x + gen_num.width < tile.x + tile.width
+    centers = layout.vertex_centers(tile_coords(), TILE_ASPECT)
+    assert len(set(centers)) == 54
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+def test_cards_and_panels_fit_in_the_window(width, height):
+    layout = get_layout(width, height)
+    for stack, _ in layout.cards(16, CARD_ASPECT):
+        assert all(inside(card, width, height) for card in stack)
+    for card, _ in layout.bank_cards(CARD_ASPECT):
+        assert inside(card, width, height)
+    for box, graphics in layout.player_rows(4, (CARD_ASPECT,) * 4):
+        assert inside(box, width, height)
+        assert all(inside(area, width, height) for area, _, _ in graphics)
+    assert inside(layout.left_die, width, height) and inside(layout.right_die, width, height)
+    assert layout.left_die.x + layout.left_die.width <= layout.right_die.x
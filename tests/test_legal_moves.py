@@ -0,0 +1,87 @@
+"""The cached clickable vertices and the search's moves against the uncached legality checks"""
+import pytest
+
+from board import Board
+from board_config import VERTEX_ADJACENCY
+from mcts import apply_move, legal_moves, road_spots
+
+
+@pytest.mark.parametrize("settlement_pos", [-1, None])
+def test_no_start_road_without_a_placed_settlement(settlement_pos):
+    board = Board(seed=0)
+    state = board.game_state
+    state.tags['settlement_pos'] = settlement_pos
+    assert road_spots(board, state.get_current_player()) == []
+    state.tags['road'] = True
+    assert board.get_clickable_vertices() == []
+
+
+def brute_force_clickable(board, action) -> list[int]:
+    """The clickable vertices of the current player from the is_valid_* checks alone"""
+    state = board.game_state
+    player = state.get_current_player()
+    if action == 'settlement':
+        spots = [vertex for vertex in range(54) if board.is_valid_settle_spot(player, vertex)]
+    elif action == 'city':
+        spots = [vertex for vertex in range(54) if board.is_valid_city_spot(player, vertex)]
+    elif state.tags['road_v1'] is None:
+        spots = [vertex for vertex in range(54)
+                 if any(board.is_valid_road_spot(player, vertex, neighbor)
+                        for neighbor in VERTEX_ADJACENCY[vertex])]
+    else:
+        spots = [vertex for vertex in VERTEX_ADJACENCY[state.tags['road_v1']]
+                 if board.is_valid_road_spot(player, state.tags['road_v1'], vertex)]
+    return sorted(spots)
+
+
+def assert_cache_matches(board):
+    """Compare every player's cached clickable vertices with the brute force ones"""
+    state = board.game_state
+    # the checks flip tags, which mustn't end up in the undo log
+    recording = board.undo_log.enabled
+    board.undo_log.enabled = False
+    current = state.current_player_index
+    for player_id in range(len(board.players)):
+        state.current_player_index = player_id
+        for action in ('settlement', 'city', 'road'):
+            state.tags[action] = True
+            expected = brute_force_clickable(board, action)
+            assert sorted(board.get_clickable_vertices()) == expected, (player_id, action)
+            if action == 'road':
+                # the far ends of the roads from each possible first vertex
+                for road_v1 in expected:
+                    state.tags['road_v1'] = road_v1
+                    assert sorted(board.get_clickable_vertices()) == \
+                        brute_force_clickable(board, action), (player_id, road_v1)
+                state.tags['road_v1'] = None
+            state.tags[action] = False
+    state.current_player_index = current
+    board.undo_log.enabled = recording
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_cache_matches_legality_checks(seed):
+    board = Board(seed=seed)
+    state = board.game_state
+    board.undo_log.enabled = True
+    assert_cache_matches(board)
+    while state.is_start_phase():
+        # settlement and road one at a time, so the half placed turn is checked too
+        moves = legal_moves(board)
+        apply_move(board, board.rng.choice(moves))
+        assert_cache_matches(board)
+    for turn in range(60):
+        if board.get_winner() is not None:
+            break
+        before = board.snapshot()
+        mark = board.undo_log.mark()
+        board.ai_turn(state.get_current_player())
+        assert_cache_matches(board)
+        if turn % 3 == 0:
+            # unmake the turn, then jump forward to it again with restore
+            after = board.snapshot()
+            board.undo_log.undo(mark)
+            assert board.snapshot() == before
+            assert_cache_matches(board)
+            board.restore(after)
+            assert_cache_matches(board)
@@ -0,0 +1,64 @@
+"""The incremental longest road against a brute force search over Board.roads"""
+import pytest
+
+from board import Board
+from board_config import BUILDING_COSTS, Building
+
+
+def brute_force_longest_road(board, player) -> int:
+    """Longest trail of the player's roads, not passing through another player's building"""
+    roads = [road for road in board.roads if road.owner is player]
+
+    def walk(vertex_index, used):
+        longest = 0
+        for road in roads:
+            if road in used or vertex_index not in (road.vertex1, road.vertex2):
+                continue
+            other = road.vertex2 if road.vertex1 == vertex_index else road.vertex1
+            owner = board.vertices[other].owner
+            if owner is not None and owner is not player:
+                length = 1
+            else:
+                length = 1 + walk(other, used | {road})
+            longest = max(longest, length)
+        return longest
+
+    starts = {vertex for road in roads for vertex in (road.vertex1, road.vertex2)}
+    return max((walk(vertex, frozenset()) for vertex in starts), default=0)
+
+
+def assert_matches(board):
+    for player in board.players:
+        assert board.calculate_player_longest_road(player) == \
+            brute_force_longest_road(board, player)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_brute_force_through_a_game(seed):
+    board = Board(seed=seed)
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+        assert_matches(board)
+    for _ in range(300):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player())
+        assert_matches(board)
+
+
+def test_settlement_splits_another_players_road():
+    board = Board(seed=0)
+    red, blue = board.players[0], board.players[1]
+    board.add_resources(red, BUILDING_COSTS[Building.SETTLEMENT])
+    assert board.place_building(Building.SETTLEMENT, red, 0)
+    # red's road runs 0-3-7-11, then blue settles in the middle of it at 7
+    for vertex1, vertex2 in ((0, 3), (3, 7), (7, 11)):
+        board.add_resources(red, BUILDING_COSTS[Building.ROAD])
+        assert board.place_road(red, vertex1, vertex2)
+    assert board.calculate_player_longest_road(red) == 3
+    # the start phase allows one settlement a turn, and blue's is a new turn
+    board.game_state.tags['settlements_placed_turn'] = 0
+    board.add_resources(blue, BUILDING_COSTS[Building.SETTLEMENT])
+    assert board.place_building(Building.SETTLEMENT, blue, 7)
+    assert board.calculate_player_longest_road(red) == brute_force_longest_road(board, red) == 2
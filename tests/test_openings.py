@@ -0,0 +1,33 @@
+"""The shipped opening book answers both placements of every seat on the beginner layout"""
+import pytest
+
+from ai import make_policy
+from board import Board
+from board_config import NUM_PLAYERS
+from openings import OpeningBook, load_book
+
+
+@pytest.mark.parametrize("opponents", ["pips", "random"])
+@pytest.mark.parametrize("seat", range(NUM_PLAYERS))
+def test_book_answers_every_placement_of_every_seat(seat, opponents):
+    book = load_book()
+    for seed in range(10):
+        board = Board(seed=seed)
+        policy = make_policy(opponents)
+        state = board.game_state
+        placements = 0
+        while state.is_start_phase():
+            player = state.get_current_player()
+            if state.current_player_index == seat:
+                assert book.play(board, player), f"no book move, game {seed}"
+                placements += 1
+            else:
+                policy.start_turn(board, player)
+        assert placements == 2
+        assert board.bitboard.buildings(seat).bit_count() == 2
+
+
+def test_save_and_load_keep_the_ranking(tmp_path):
+    book = OpeningBook({(1, 0, 0): ((3, 4), (10, 12)), (1, 2, 1 << 3): ((20, 30),)})
+    book.save(tmp_path / "test.book")
+    assert OpeningBook.load(tmp_path / "test.book").entries == book.entries
@@ -0,0 +1,59 @@
+"""Copies of a Board made by clone() or restore() play on exactly like the original"""
+import random
+
+import pytest
+
+from board import Board
+from benchmark import midgame_board
+
+
+def play_on(board, seed, turns=40):
+    """Play turns with dice and choices from seed, returns the final snapshot"""
+    board.rng.seed(seed)
+    state = board.game_state
+    for _ in range(turns):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player())
+    return board.snapshot()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_clone_plays_out_like_the_original(seed):
+    board = midgame_board(seed=seed, turns=30)
+    clone = board.clone()
+    assert clone.snapshot() == board.snapshot()
+    assert play_on(clone, seed) == play_on(board, seed)
+    assert clone.position_key() == board.position_key()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_restored_board_plays_out_like_the_original(seed):
+    board = midgame_board(seed=seed, turns=30)
+    snapshot = board.snapshot()
+    # a fresh board, and one part way through another game, brought to the same position
+    restored = [Board(), midgame_board(seed=seed + 100, turns=60)]
+    for other in restored:
+        other.restore(snapshot)
+        assert other.snapshot() == snapshot
+    expected = play_on(board, seed)
+    for other in restored:
+        assert play_on(other, seed) == expected
+    # and the original itself, back from where it got to
+    board.restore(snapshot)
+    assert play_on(board, seed) == expected
+
+
+def test_shuffled_layout_survives_restore_and_clone():
+    board = Board(seed=4)
+    board.shuffle_layout(random.Random(9))
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+    snapshot = board.snapshot()
+    restored = Board()
+    restored.restore(snapshot)
+    clone = board.clone()
+    expected = play_on(board, 1)
+    assert play_on(restored, 1) == expected
+    assert play_on(clone, 1) == expected
@@ -0,0 +1,83 @@
+"""Making moves and unmaking them with the undo log returns the Board to where it was"""
+import pytest
+
+from board import Board
+from mcts import apply_move, legal_moves
+
+
+def start_phase_board(seed):
+    board = Board(seed=seed)
+    board.undo_log.enabled = True
+    return board
+
+
+def play_start_phase(board):
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+    board.undo_log.clear()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_undo_ai_start_turns(seed):
+    board = start_phase_board(seed)
+    state = board.game_state
+    while state.is_start_phase():
+        before = board.snapshot()
+        mark = board.undo_log.mark()
+        board.ai_start_turn(state.get_current_player())
+        after = board.snapshot()
+        board.undo_log.undo(mark)
+        assert board.snapshot() == before
+        # and forward again to the same place
+        board.restore(after)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_undo_ai_turns(seed):
+    board = start_phase_board(seed)
+    play_start_phase(board)
+    state = board.game_state
+    for _ in range(150):
+        if board.get_winner() is not None:
+            break
+        before = board.snapshot()
+        mark = board.undo_log.mark()
+        board.ai_turn(state.get_current_player())
+        after = board.snapshot()
+        board.undo_log.undo(mark)
+        assert board.snapshot() == before
+        board.restore(after)
+
+
+def test_undo_many_turns_at_once():
+    board = start_phase_board(7)
+    play_start_phase(board)
+    state = board.game_state
+    before = board.snapshot()
+    clickable = board.get_clickable_vertices()
+    mark = board.undo_log.mark()
+    for _ in range(40):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player())
+    board.undo_log.undo(mark)
+    assert board.snapshot() == before
+    assert board.get_clickable_vertices() == clickable
+
+
+def test_undo_search_moves():
+    board = start_phase_board(3)
+    play_start_phase(board)
+    state = board.game_state
+    board.ai_turn(state.get_current_player())
+    board.undo_log.clear()
+    state.roll_dice()
+    board.start_turn(state.get_current_player(), (3, 3))
+    state.start_building_phase()
+    before = board.snapshot()
+    for move in legal_moves(board):
+        mark = board.undo_log.mark()
+        apply_move(board, move)
+        board.undo_log.undo(mark)
+        assert board.snapshot() == before, move
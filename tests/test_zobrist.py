@@ -0,0 +1,88 @@
+"""The hash the Board keeps up to date against hashing the position from scratch"""
+import random
+
+import pytest
+
+from board import Board
+from board_config import BUILDING_COSTS, Building
+from zobrist import TranspositionTable, board_key
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_hash_matches_through_a_game(seed):
+    board = Board(seed=seed)
+    state = board.game_state
+    assert board.zobrist == board_key(board)
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+        assert board.zobrist == board_key(board)
+    for _ in range(150):
+        if board.get_winner() is not None:
+            break
+        board.ai_turn(state.get_current_player())
+        assert board.zobrist == board_key(board)
+
+
+def test_hash_after_undo_restore_and_clone():
+    board = Board(seed=11)
+    state = board.game_state
+    while state.is_start_phase():
+        board.ai_start_turn(state.get_current_player())
+    snapshots = []
+    board.undo_log.enabled = True
+    for _ in range(60):
+        if board.get_winner() is not None:
+            break
+        snapshots.append((board.snapshot(), board.position_key()))
+        mark = board.undo_log.mark()
+        # the undo log doesn't rewind the dice, so replay the turn with the same ones
+        rng_state = board.rng.getstate()
+        board.ai_turn(state.get_current_player())
+        key = board.position_key()
+        board.undo_log.undo(mark)
+        assert board.position_key() == snapshots[-1][1]
+        assert board.zobrist == board_key(board)
+        board.rng.setstate(rng_state)
+        board.ai_turn(state.get_current_player())
+        assert board.position_key() == key
+        board.undo_log.clear()
+    for snapshot, key in random.Random(0).sample(snapshots, 20):
+        board.restore(snapshot)
+        assert board.position_key() == key
+        assert board.zobrist == board_key(board)
+        assert board.clone().position_key() == key
+
+
+def test_move_orders_transpose():
+    keys = []
+    for roads in (((0, 3), (0, 4)), ((0, 4), (0, 3))):
+        board = Board(seed=0)
+        red = board.players[0]
+        board.add_resources(red, BUILDING_COSTS[Building.SETTLEMENT])
+        board.place_building(Building.SETTLEMENT, red, 0)
+        for vertex1, vertex2 in roads:
+            board.add_resources(red, BUILDING_COSTS[Building.ROAD])
+            assert board.place_road(red, vertex1, vertex2)
+        keys.append(board.position_key())
+    assert keys[0] == keys[1]
+
+
+def test_shuffled_layout_hashes_its_robber():
+    board = Board(seed=0)
+    board.shuffle_layout(random.Random(5))
+    assert board.zobrist == board_key(board)
+
+
+def test_transposition_table_keeps_the_heavier_result():
+    table = TranspositionTable(size=4)
+    table.new_search()
+    assert table.put(1, "light", weight=1)
+    # 5 lands in the same slot as 1
+    assert not table.put(5, "lighter", weight=0)
+    assert table.get(1) == "light"
+    assert table.put(5, "heavy", weight=3)
+    assert table.get(5) == "heavy" and table.get(1) is None
+    # results of an earlier search give way
+    table.new_search()
+    assert table.put(1, "new", weight=1)
+    assert table.get(1) == "new"
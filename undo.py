@@ -0,0 +1,39 @@
+"""
+Reversible moves for in-place search.
+While recording, every mutating Board and GameState operation pushes an undo record,
+so search code can make a move, look ahead, and unmake it without copying the Board.
+"""
+
+
+class UndoLog:
+    """
+    records: stack of (function, args) pairs that reverse one change each when called
+    enabled: changes are only recorded while this is True
+    """
+    def __init__(self):
+        self.records = []
+        self.enabled = False
+
+    def push(self, undo, *args):
+        """Record how to reverse a change that is about to be made"""
+        if self.enabled:
+            self.records.append((undo, args))
+
+    def mark(self) -> int:
+        """returns a position to undo back to later"""
+        return len(self.records)
+
+    def undo(self, mark=0):
+        """Reverse every change recorded since mark, most recent first"""
+        records = self.records
+        # undoing must not record anything new
+        enabled = self.enabled
+        self.enabled = False
+        while len(records) > mark:
+            undo, args = records.pop()
+            undo(*args)
+        self.enabled = enabled
+
+    def clear(self):
+        """Forget every record without undoing it"""
+        self.records.clear()
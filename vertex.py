@@ -5,6 +5,8 @@ from board_config import *
 
 class Vertex:
     """Class representing what is contained on a vertex"""
+    __slots__ = ("owner", "building")
+
     def __init__(self):
         self.owner = None
         self.building = Building.NONE
@@ -0,0 +1,127 @@
+"""
+Zobrist hashing of Board positions.
+Every feature a position can have (a player's settlement or city on a vertex, a road on an edge,
+the robber on a tile, a player holding some number of a resource, whose turn it is and
+the phase of the turn) has a random 64 bit key, and the hash of a position is the xor of the
+keys of its features. Placing a piece or moving a card only xors a key or two in or out,
+so the Board keeps its hash up to date as it goes (see Board.position_key),
+and positions reached by different move orders hash the same.
+The TranspositionTable stores what a search learned about a position by its hash.
+"""
+import random
+
+from board_config import EDGES, NUM_PLAYERS, NUM_RESOURCES, BANK_RESOURCE_COUNT, Building
+from game_state import TurnState
+
+# a fixed seed, so every process (like the workers of a pool) hashes positions the same
+_rng = random.Random(0x5EED)
+
+
+def _random_keys(count) -> list[int]:
+    """returns count random 64 bit keys"""
+    return [_rng.getrandbits(64) for _ in range(count)]
+
+
+# BUILDING_KEYS[player_id][building][vertex_index], for settlements and cities
+BUILDING_KEYS = [{building: _random_keys(54) for building in (Building.SETTLEMENT, Building.CITY)}
+                 for _ in range(NUM_PLAYERS)]
+# ROAD_KEYS[player_id][edge]
+ROAD_KEYS = [_random_keys(len(EDGES)) for _ in range(NUM_PLAYERS)]
+# ROBBER_KEYS[tile_index]
+ROBBER_KEYS = _random_keys(19)
+# HAND_KEYS[player_id][Resource.value][count], a hand can't hold more of a resource than the bank
+HAND_KEYS = [[_random_keys(BANK_RESOURCE_COUNT + 1) for _ in range(NUM_RESOURCES)]
+             for _ in range(NUM_PLAYERS)]
+# TURN_KEYS[(current_player_index, TurnState, is_start, settlements placed this turn)]
+TURN_KEYS = {(player_id, state, is_start, placed): _rng.getrandbits(64)
+             for player_id in range(NUM_PLAYERS)
+             for state in TurnState
+             for is_start in (False, True)
+             for placed in (0, 1)}
+# SETTLEMENT_POS_KEYS[vertex_index] of the settlement the start phase road has to touch
+SETTLEMENT_POS_KEYS = _random_keys(54)
+
+
+def board_key(board) -> int:
+    """returns the hash of the pieces, robber and hands of a Board, computed from scratch.
+    The Board keeps this up to date in Board.zobrist"""
+    key = 0
+    for vertex_index, vertex in enumerate(board.vertices):
+        if vertex.building is not Building.NONE:
+            key ^= BUILDING_KEYS[vertex.owner.player_id][vertex.building][vertex_index]
+    for road in board.roads:
+        key ^= ROAD_KEYS[road.owner.player_id][road.edge]
+    if board.robber_tile is not None:
+        key ^= ROBBER_KEYS[board.tiles.index(board.robber_tile)]
+    for player in board.players:
+        for value, count in enumerate(player.resources):
+            key ^= HAND_KEYS[player.player_id][value][count]
+    return key
+
+
+def turn_key(game_state) -> int:
+    """returns the hash of whose turn it is and where in the turn they are"""
+    tags = game_state.tags
+    if not game_state.is_start:
+        return TURN_KEYS[(game_state.current_player_index, game_state.state, False, 0)]
+    placed = tags['settlements_placed_turn']
+    key = TURN_KEYS[(game_state.current_player_index, game_state.state, True, placed)]
+    if placed:
+        # the road placed next has to touch this settlement
+        key ^= SETTLEMENT_POS_KEYS[tags['settlement_pos']]
+    return key
+
+
+class TranspositionTable:
+    """
+    Fixed size table of search results by position hash (see Board.position_key).
+    A position's slot is its hash modulo size. When two positions want the same slot,
+    the one with more weight (e.g. rollouts behind it) is kept, unless it was stored
+    by an earlier search, which new results always replace.
+    size: number of slots
+    age: number of searches started, see new_search
+    hits, misses: lookups that found / didn't find their position
+    """
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.weights = [0] * size
+        self.ages = [0] * size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """Start a new search, the results stored so far become the first to be replaced"""
+        self.age += 1
+
+    def get(self, key):
+        """returns the value stored for the position, None if there isn't one"""
+        slot = key % self.size
+        if self.keys[slot] == key:
+            self.hits += 1
+            # still in use, keep it through this search
+            self.ages[slot] = self.age
+            return self.values[slot]
+        self.misses += 1
+        return None
+
+    def put(self, key, value, weight=1) -> bool:
+        """Store a value for the position. returns False if a weightier result was kept instead"""
+        slot = key % self.size
+        if self.keys[slot] not in (None, key) and self.ages[slot] == self.age \
+                and self.weights[slot] > weight:
+            return False
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.weights[slot] = weight
+        self.ages[slot] = self.age
+        return True
+
+    def clear(self):
+        """Forget every stored result"""
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        self.weights = [0] * self.size
+        self.ages = [0] * self.size